@@ -1,3 +1,9 @@
+import os
+
+# 모델(devna0111-7b-q4)을 만든 Modelfile (프롬프트 토큰 예산 계산용 SYSTEM / num_predict / num_ctx)
+MODELFILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Modelfile")
+DEFAULT_CONTEXT_WINDOW = 2048  # Modelfile에 num_ctx가 없으면 Ollama 기본값
+
 def create_memory_agent():
     """메모리를 가진 Langgraph Agent 생성"""
     print("메모리 Agent 생성 시작")
@@ -5,21 +11,15 @@ def create_memory_agent():
     try:
         from langgraph.graph import StateGraph, END
         from langchain_community.llms import Ollama
-        from langchain.memory import ConversationBufferMemory
+        from agent.memory import WindowedSummaryMemory, load_token_counter, prompt_budget, read_modelfile
         from typing import TypedDict, List
         import json
         from datetime import datetime
         
-        # LangChain 메모리 객체 생성
-        memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
-        )
-        
         # 1. 메모리가 강화된 State 정의
         class MemoryAgentState(TypedDict):
             messages: List[dict]          # 대화 이력 (구조화)
-            langchain_memory: str         # LangChain 메모리 문자열
+            langchain_memory: str         # 대화 메모리 문자열 (요약 + 최근 대화)
             user_profile: dict           # 사용자 정보 누적
             session_context: dict        # 세션별 맥락 정보
             current_topic: str           # 현재 대화 주제
@@ -32,6 +32,15 @@ def create_memory_agent():
             temperature=0.7,
         )
         
+        # 대화 메모리 : 최근 4턴은 원문, 이전 대화는 요약으로 보관
+        # 본문 상한 = 컨텍스트(num_ctx) - Modelfile SYSTEM 프롬프트 - 채팅 템플릿 - 답변 몫(num_predict)
+        modelfile = read_modelfile(MODELFILE_PATH)
+        context_window = int(modelfile["parameters"].get("num_ctx", DEFAULT_CONTEXT_WINDOW))
+        num_predict = int(modelfile["parameters"]["num_predict"])
+        count_tokens = load_token_counter()
+        budget = prompt_budget(context_window, num_predict, modelfile["system"], count=count_tokens)
+        memory = WindowedSummaryMemory(llm, max_tokens=budget, window_turns=4, summary_tokens=300, count_tokens=count_tokens)
+        
         # 3. 메모리 초기화 노드
         def initialize_memory_node(state: MemoryAgentState):
             """메모리 초기 설정"""
@@ -84,24 +93,20 @@ def create_memory_agent():
                 "turn_count": state['turn_count']
             }
         
-        # 5. LangChain 메모리 업데이트 노드
+        # 5. 대화 메모리 업데이트 노드
         def update_langchain_memory_node(state: MemoryAgentState):
-            """LangChain 메모리를 업데이트하고 맥락 구성"""
+            """대화 메모리를 업데이트하고 맥락 구성"""
             messages = state['messages']
             user_profile = state['user_profile']
             turn_count = state['turn_count'] + 1
             
-            # LangChain 메모리에 대화 추가
-            if messages:
-                latest_message = messages[-1]
-                if latest_message['role'] == 'user':
-                    memory.chat_memory.add_user_message(latest_message['content'])
-                elif latest_message['role'] == 'assistant':
-                    memory.chat_memory.add_ai_message(latest_message['content'])
+            # 현재 사용자 메시지는 respond에서 프롬프트를 만든 뒤 메모리에 추가
+            # (먼저 넣으면 메모리와 "현재 사용자 메시지"로 프롬프트에 두 번 들어감)
+            if messages and messages[-1]['role'] == 'assistant':
+                memory.add_ai_message(messages[-1]['content'])
             
-            # LangChain 메모리에서 대화 이력 가져오기
-            memory_content = memory.load_memory_variables({})
-            langchain_memory = str(memory_content.get('chat_history', []))
+            # 요약 + 최근 대화 원문 (현재 턴 이전까지)
+            langchain_memory = memory.render()
             
             # 현재 주제 추측
             current_topic = "일반대화"
@@ -125,24 +130,24 @@ def create_memory_agent():
         
         # 6. 맥락 기반 응답 생성 노드
         def contextual_response_node(state: MemoryAgentState):
-            """LangChain 메모리와 맥락을 고려한 응답 생성"""
+            """대화 메모리와 맥락을 고려한 응답 생성"""
             messages = state['messages']
-            langchain_memory = state['langchain_memory']
             user_profile = state['user_profile']
             current_topic = state['current_topic']
             turn_count = state['turn_count']
             
             if not messages:
-                response_content = "안녕하세요! 저는 LangChain 메모리를 활용하는 AI입니다."
+                response_content = "안녕하세요! 저는 대화 메모리를 활용하는 AI입니다."
                 # 메모리에 첫 인사 추가
-                memory.chat_memory.add_ai_message(response_content)
+                memory.add_ai_message(response_content)
             else:
                 user_message = messages[-1]['content']
                 
-                # LangChain 메모리를 활용한 맥락이 풍부한 프롬프트 구성
-                context_prompt = f"""
-LangChain 대화 메모리:
-{langchain_memory}
+                # 메모리를 활용한 맥락이 풍부한 프롬프트 구성 (메모리에는 아직 현재 메시지가 없음)
+                # 완성된 프롬프트가 토큰 상한을 넘으면 메모리를 줄여서 다시 구성
+                context_prompt = memory.render_prompt(lambda history: f"""
+이전 대화 메모리:
+{history}
 
 사용자 정보: {json.dumps(user_profile, ensure_ascii=False)}
 현재 주제: {current_topic}
@@ -150,20 +155,22 @@ LangChain 대화 메모리:
 
 현재 사용자 메시지: {user_message}
 
-위의 LangChain 메모리와 맥락을 고려하여 자연스럽고 연관성 있는 답변을 해주세요.
+위의 대화 메모리와 맥락을 고려하여 자연스럽고 연관성 있는 답변을 해주세요.
 이전 대화의 흐름을 이어가며 답변하세요.
-"""
+""")
+                print(f"프롬프트 토큰: {memory.last_prompt_tokens} / {memory.max_tokens}")
                 
                 response_content = llm.invoke(context_prompt)
-                # 응답을 메모리에 추가
-                memory.chat_memory.add_ai_message(response_content)
+                # 이번 턴(사용자 메시지 + 응답)을 메모리에 추가 (오래된 턴은 자동으로 요약됨)
+                memory.add_user_message(user_message)
+                memory.add_ai_message(response_content)
             
             # 새 메시지를 대화 이력에 추가
             new_message = {"role": "assistant", "content": response_content}
             updated_messages = messages + [new_message]
             
             # 업데이트된 메모리 가져오기
-            updated_memory = str(memory.load_memory_variables({}).get('chat_history', []))
+            updated_memory = memory.render()
             
             return {
                 "messages": updated_messages,
@@ -247,30 +254,30 @@ def test_memory_agent():
         print(f"현재 주제: {result['current_topic']}")
         print(f"사용자 정보: {result['user_profile']}")
         print(f"대화 턴: {result['turn_count']}")
-        print(f"LangChain 메모리 크기: {len(result['langchain_memory'])} 문자")
+        print(f"메모리 크기: {len(result['langchain_memory'])} 문자")
 
 def explain_memory_concepts():
     """메모리 개념 설명"""
     print("\n=== 메모리 Agent 핵심 개념 ===")
     
     concepts = {
-        "LangChain Memory": "LangChain의 ConversationBufferMemory 활용",
+        "윈도우 + 요약 메모리": "최근 K턴은 원문, 이전 대화는 누적 요약으로 보관",
         "자동 메모리 관리": "대화 자동 저장 및 불러오기",
         "사용자 프로필": "사용자 정보를 누적하여 개인화",
         "세션 맥락": "현재 세션의 맥락 정보 관리", 
         "주제 추적": "대화 주제의 변화를 감지하고 추적",
-        "통합 메모리": "LangChain + 커스텀 메모리 조합"
+        "토큰 상한": "완성된 프롬프트의 토큰 수를 세어 상한을 넘지 않게 메모리를 줄임"
     }
     
     for concept, description in concepts.items():
         print(f"• {concept}: {description}")
     
-    print("\n=== LangChain 메모리 활용법 ===")
-    print("1. ConversationBufferMemory로 대화 자동 저장")
-    print("2. chat_memory.add_user_message() - 사용자 메시지 추가")
-    print("3. chat_memory.add_ai_message() - AI 응답 추가")
-    print("4. load_memory_variables() - 저장된 대화 불러오기")
-    print("5. 커스텀 State와 LangChain 메모리 통합 활용")
+    print("\n=== 메모리 활용법 ===")
+    print("1. WindowedSummaryMemory로 대화 자동 저장 (오래된 턴은 자동 요약)")
+    print("2. add_user_message() - 사용자 메시지 추가")
+    print("3. add_ai_message() - AI 응답 추가")
+    print("4. render() - 요약 + 최근 대화 불러오기")
+    print("5. render_prompt() - 토큰 상한 안에서 프롬프트 구성")
     
     print("\n=== 실무 활용 ===")
     print("- 개인 비서: 사용자 선호도 학습")
@@ -11,7 +11,7 @@
     app.invoke(new_input, config={"configurable": {"thread_id": "user123"}})
 '''
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver # 핵심 모듈
+from checkpointer.bounded_memory import BoundedMemorySaver # 핵심 모듈 (메모리 상한이 있는 MemorySaver)
 from typing import TypedDict, Literal
 
 # 상태 정의
@@ -63,8 +63,8 @@ workflow.set_entry_point("classifier")
 workflow.add_conditional_edges("classifier", route_to_answer, {"answer": "answer"})
 workflow.add_edge("answer", END)
 
-# 체크포인터 설정 (메모리 저장)
-memory = MemorySaver()
+# 체크포인터 설정 (메모리 저장, 상한을 넘으면 오래 안 쓴 thread를 디스크로 내보냄)
+memory = BoundedMemorySaver(max_bytes=64 * 1024 * 1024)
 app = workflow.compile(checkpointer=memory)
 
 try:
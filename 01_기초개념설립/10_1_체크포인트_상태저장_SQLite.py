@@ -1,5 +1,6 @@
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.sqlite import SqliteSaver
+from checkpointer.sqlite_tuned import TunedSqliteSaver
+from checkpointer.cache import CachedCheckpointSaver
 from typing import TypedDict, Literal
 
 # 상태 정의
@@ -55,7 +56,10 @@ workflow.add_edge("answer", END)
 
 # SQLite 체크포인터 설정
 db_path = "db/checkpoints.db"
-with SqliteSaver.from_conn_string(db_path) as checkpointer:
+# WAL + 그룹 커밋 + 읽기 연결 풀 (여러 thread_id를 동시에 처리할 때 유리)
+with TunedSqliteSaver.from_conn_string(db_path) as saver:
+    # 최근 사용한 thread의 최신 체크포인트는 메모리에서 바로 읽음 (DB 조회 + 역직렬화 생략)
+    checkpointer = CachedCheckpointSaver(saver)
     app = workflow.compile(checkpointer=checkpointer)
     
     # 테스트
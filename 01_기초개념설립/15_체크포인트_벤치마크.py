@@ -0,0 +1,280 @@
+'''
+체크포인터 벤치마크 : 상태 크기 / 대화 길이 / 동시 thread 수에 따른 저장 비용 측정
+ - 프로젝트의 실제 상태 스키마(CustomerState, ResearchState, ApprovalState)에 합성 데이터를 채워 그래프 실행
+    - str 필드 : payload 바이트 크기의 텍스트
+    - Annotated[list, operator.add] 필드 : 턴마다 Human/AI 메시지 추가 => 히스토리 길이 증가
+ - 측정 항목
+    - put 지연 (그래프 실행 중 체크포인트 저장) p50 / p95 / p99
+    - get 지연 (app.get_state) p50 / p95 / p99
+    - 체크포인트당 바이트, 진행률(25/50/75/100%)별 저장소 크기 => 선형/이차 증가 여부 확인
+ - --out 으로 결과 저장, --baseline 으로 이전 결과와 비교해 threshold 이상 나빠지면 종료 코드 1
+
+ # 사용
+    python 01_기초개념설립/15_체크포인트_벤치마크.py
+    python 01_기초개념설립/15_체크포인트_벤치마크.py --savers memory sqlite delta --history 20 100 --payload 512 8192 --threads 1 8
+    python 01_기초개념설립/15_체크포인트_벤치마크.py --out bench.json
+    python 01_기초개념설립/15_체크포인트_벤치마크.py --baseline bench.json --threshold 0.2
+'''
+import argparse
+import ast
+import json
+import operator
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Annotated, Literal, TypedDict, get_args, get_origin, get_type_hints
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph import END, StateGraph
+
+from checkpointer.bounded_memory import BoundedMemorySaver
+from checkpointer.compression import CompressedSerializer
+from checkpointer.delta import DeltaSqliteSaver
+from checkpointer.sqlite_tuned import TunedSqliteSaver
+
+ROOT = Path(__file__).resolve().parent.parent
+# (스키마 이름, 정의된 파일) : 스크립트를 실행하지 않고 클래스 정의만 읽어옴
+SCHEMAS = {
+    "CustomerState": ROOT / "01_기초개념설립" / "09_체크포인트_상태저장_MemorySavor.py",
+    "ResearchState": ROOT / "02_심화기능" / "04_복잡한멀티에이전트_계층구조.py",
+    "ApprovalState": ROOT / "02_심화기능" / "02_휴먼인더루프.py",
+}
+WORDS = "고객 문의 로그인 결제 환불 인공지능 반도체 시장 분석 보고서 전망 데이터 기술 투자 승인 초안".split()
+
+
+def load_schema(name: str, path: Path) -> type:
+    """파일에서 TypedDict 클래스 정의만 찾아 실행 (LLM 생성/그래프 실행 등 부수효과 없이)"""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    node = next(n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == name)
+    namespace = {"TypedDict": TypedDict, "Annotated": Annotated, "Literal": Literal, "operator": operator}
+    exec(compile(ast.Module(body=[node], type_ignores=[]), str(path), "exec"), namespace)
+    return namespace[name]
+
+
+def synthetic_text(size: int, rng: random.Random) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word.encode("utf-8")) + 1
+    return " ".join(words)
+
+
+def build_graph(schema: type, payload: int):
+    """스키마 필드 타입을 보고 합성 업데이트를 만드는 노드 1개짜리 그래프"""
+    hints = get_type_hints(schema, include_extras=True)
+
+    def step(state: dict) -> dict:
+        rng = random.Random(len(state.get("messages", [])))
+        update = {}
+        for field, hint in hints.items():
+            base = get_args(hint)[0] if get_origin(hint) is Annotated else hint
+            if base is list:
+                update[field] = [AIMessage(content=synthetic_text(payload, rng))]
+            elif base is str:
+                update[field] = synthetic_text(payload, rng)
+            elif base is float:
+                update[field] = rng.random()
+            elif base is int:
+                update[field] = state.get(field, 0) + 1
+            elif base is bool:
+                update[field] = False
+        return update
+
+    workflow = StateGraph(schema)
+    workflow.add_node("step", step)
+    workflow.set_entry_point("step")
+    workflow.add_edge("step", END)
+    return workflow, hints
+
+
+def first_input(hints: dict, turn: int) -> dict:
+    state = {}
+    for field, hint in hints.items():
+        base = get_args(hint)[0] if get_origin(hint) is Annotated else hint
+        if base is list:
+            state[field] = [HumanMessage(content=f"질문 {turn}")]
+        elif turn == 0:
+            state[field] = base() if base in (str, float, int, bool) else None
+    return state
+
+
+# 체크포인터 생성 (이름 -> 컨텍스트 매니저)
+@contextmanager
+def open_saver(name: str, workdir: str):
+    db_path = os.path.join(workdir, f"{name}.db")
+    if name == "memory":
+        yield MemorySaver(), None
+    elif name == "bounded":
+        saver = BoundedMemorySaver(max_bytes=16 * 1024 * 1024, spill_dir=os.path.join(workdir, "spill"))
+        yield saver, None
+        saver.close()
+    elif name == "sqlite":
+        with SqliteSaver.from_conn_string(db_path) as saver:
+            yield saver, db_path
+    elif name == "tuned":
+        with TunedSqliteSaver.from_conn_string(db_path) as saver:
+            yield saver, db_path
+    elif name == "delta":
+        with DeltaSqliteSaver.from_conn_string(db_path) as saver:
+            yield saver, db_path
+    elif name == "compressed":
+        serde = CompressedSerializer(dict_dir=os.path.join(workdir, "dicts"))
+        with TunedSqliteSaver.from_conn_string(db_path, serde=serde) as saver:
+            yield saver, db_path
+    else:
+        raise ValueError(f"알 수 없는 체크포인터: {name}")
+
+
+def storage_bytes(saver, db_path) -> int:
+    if db_path:
+        if hasattr(saver, "flush"):
+            saver.flush()
+        return sum(os.path.getsize(path) for path in (db_path, db_path + "-wal") if os.path.exists(path))
+    if isinstance(saver, BoundedMemorySaver):
+        return saver.resident_bytes + saver.spilled_bytes
+    # MemorySaver : 메모리에 보관 중인 직렬화 바이트 합계
+    total = sum(len(c[1]) + len(m[1]) for ns in saver.storage.values() for items in ns.values() for c, m, _ in items.values())
+    total += sum(len(blob[1]) for blob in saver.blobs.values())
+    total += sum(len(write[2][1]) for writes in saver.writes.values() for write in writes.values())
+    return total
+
+
+def percentiles(samples: list) -> dict:
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordered = sorted(samples)
+    # 초 단위 측정값을 ms로 변환
+    return {f"p{int(p * 100)}": ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000 for p in (0.50, 0.95, 0.99)}
+
+
+def run_case(schema_name: str, schema: type, saver_name: str, history: int, payload: int, threads: int) -> dict:
+    workflow, hints = build_graph(schema, payload)
+    put_times, get_times = [], []
+
+    with tempfile.TemporaryDirectory(prefix="ckpt-bench-") as workdir, open_saver(saver_name, workdir) as (saver, db_path):
+        # 인스턴스 메서드를 감싸 그래프 내부의 put 호출 시간만 측정
+        original_put = saver.put
+
+        def timed_put(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original_put(*args, **kwargs)
+            finally:
+                put_times.append(time.perf_counter() - start)
+
+        saver.put = timed_put
+        app = workflow.compile(checkpointer=saver)
+
+        growth = {}
+        marks = {max(1, history * q // 4): f"{q * 25}%" for q in range(1, 5)}
+
+        def conversation(thread: int) -> None:
+            config = {"configurable": {"thread_id": f"{schema_name}-{thread}"}}
+            for turn in range(history):
+                app.invoke(first_input(hints, turn), config)
+                start = time.perf_counter()
+                app.get_state(config)
+                get_times.append(time.perf_counter() - start)
+                if thread == 0 and turn + 1 in marks:
+                    growth[marks[turn + 1]] = storage_bytes(saver, db_path)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(conversation, range(threads)))
+        elapsed = time.perf_counter() - start
+
+        total_bytes = storage_bytes(saver, db_path)
+        checkpoints = len(put_times)
+        return {
+            "schema": schema_name,
+            "saver": saver_name,
+            "history": history,
+            "payload": payload,
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "elapsed": elapsed,
+            "put_ms": percentiles(put_times),
+            "get_ms": percentiles(get_times),
+            "bytes_total": total_bytes,
+            "bytes_per_checkpoint": total_bytes / checkpoints if checkpoints else 0,
+            "growth": growth,
+        }
+
+
+def case_key(result: dict) -> str:
+    return f"{result['schema']}/{result['saver']}/h{result['history']}/p{result['payload']}/t{result['threads']}"
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> list:
+    """p95 지연/체크포인트당 바이트가 기준 대비 threshold 이상 증가한 항목"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {case_key(r): r for r in json.load(f)}
+    regressions = []
+    for result in results:
+        before = baseline.get(case_key(result))
+        if not before:
+            continue
+        checks = {
+            "put_p95": (before["put_ms"]["p95"], result["put_ms"]["p95"]),
+            "get_p95": (before["get_ms"]["p95"], result["get_ms"]["p95"]),
+            "bytes_per_checkpoint": (before["bytes_per_checkpoint"], result["bytes_per_checkpoint"]),
+        }
+        for metric, (old, new) in checks.items():
+            if old and new > old * (1 + threshold):
+                regressions.append(f"{case_key(result)} {metric}: {old:.2f} -> {new:.2f} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="체크포인터 벤치마크")
+    parser.add_argument("--schemas", nargs="+", default=list(SCHEMAS))
+    parser.add_argument("--savers", nargs="+", default=["memory", "sqlite", "tuned", "delta"],
+                        help="memory / bounded / sqlite / tuned / delta / compressed")
+    parser.add_argument("--history", nargs="+", type=int, default=[10, 50], help="thread당 대화 턴 수")
+    parser.add_argument("--payload", nargs="+", type=int, default=[512, 8192], help="텍스트 필드 크기(bytes)")
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 8], help="동시 thread 수")
+    parser.add_argument("--out", help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="허용 증가율 (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'case':<45} {'put p50/p95/p99 (ms)':>24} {'get p50/p95 (ms)':>18} {'B/ckpt':>10} {'total':>10}")
+    for schema_name in args.schemas:
+        schema = load_schema(schema_name, SCHEMAS[schema_name])
+        for saver_name in args.savers:
+            for history in args.history:
+                for payload in args.payload:
+                    for threads in args.threads:
+                        result = run_case(schema_name, schema, saver_name, history, payload, threads)
+                        results.append(result)
+                        put, get = result["put_ms"], result["get_ms"]
+                        print(f"{case_key(result):<45} {put['p50']:>7.2f}/{put['p95']:>7.2f}/{put['p99']:>7.2f} "
+                              f"{get['p50']:>8.2f}/{get['p95']:>8.2f} {result['bytes_per_checkpoint']:>10.0f} {result['bytes_total']:>10}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 결과 저장: {args.out}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ 성능/저장량 회귀 {len(regressions)}건")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("\n✅ 기준 대비 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+'''
+토큰 상한이 있는 대화 메모리 (최근 K턴 원문 + 이전 대화 누적 요약)
+ - ConversationBufferMemory는 모든 대화를 그대로 보관
+   => 턴이 쌓일수록 프롬프트 길이와 응답 지연이 끝없이 증가
+ - WindowedSummaryMemory
+    1. 최근 window_turns 턴(사용자 메시지 + AI 응답)은 원문 그대로 유지
+    2. 그보다 오래된 턴은 LLM으로 요약해 누적 요약(rolling summary)에 합침 (요약 길이도 summary_tokens로 제한)
+    3. render_prompt(build)는 완성된 프롬프트 전체의 토큰 수를 세어 max_tokens를 넘으면
+       오래된 턴부터 요약으로 옮기고, 그래도 넘으면 요약을 잘라 상한을 보장
+ - 토큰 수는 모델과 같은 Qwen2.5 토크나이저(transformers)로 정확히 계산
+   설치/다운로드가 안 되는 환경에서는 여유분을 더한 추정치 사용 (정확한 상한은 아님)
+ - max_tokens는 render_prompt가 만드는 본문만의 상한
+   Ollama가 붙이는 SYSTEM 프롬프트/채팅 템플릿과 답변 몫(num_predict)은 prompt_budget으로 미리 빼서 전달
+   (SYSTEM / num_predict / num_ctx는 read_modelfile로 Modelfile에서 읽음 => 손으로 옮겨 적은 값이 어긋나지 않도록)
+
+ # 사용
+    count = load_token_counter()
+    modelfile = read_modelfile("Modelfile")
+    budget = prompt_budget(context_window=2048, num_predict=int(modelfile["parameters"]["num_predict"]),
+                           system_prompt=modelfile["system"], count=count)
+    memory = WindowedSummaryMemory(llm, max_tokens=budget, window_turns=4, count_tokens=count)
+    memory.add_user_message("저는 김철수입니다.")
+    prompt = memory.render_prompt(lambda history: f"대화 메모리:\n{history}\n\n질문: ...")
+'''
+import re
+from typing import Callable, Optional
+
+# Modelfile의 베이스 모델(qwen2.5-7b-instruct)과 같은 토크나이저
+DEFAULT_TOKENIZER = "Qwen/Qwen2.5-7B-Instruct"
+
+SUMMARY_PROMPT = """다음은 지금까지의 대화 요약과 이어지는 대화입니다.
+두 내용을 합쳐 하나의 요약으로 다시 작성하세요.
+사용자 이름, 선호, 요청 사항처럼 이후 대화에 필요한 사실은 반드시 남기고 {limit}토큰 이내로 작성하세요.
+요약만 출력하세요.
+
+[기존 요약]
+{summary}
+
+[이어지는 대화]
+{lines}"""
+
+ROLE_LABELS = {"user": "사용자", "assistant": "AI"}
+
+# 추정치 여유분 : Qwen의 byte-level BPE는 드문 한글 음절을 여러 바이트 토큰으로 쪼갤 수 있음
+ESTIMATE_MARGIN = 1.3
+
+# 채팅 템플릿이 붙이는 특수 토큰/역할 표시 (<|im_start|>system ... <|im_start|>assistant)
+TEMPLATE_TOKENS = 32
+
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 넉넉하게 토큰 수 추정
+    한글 등 비ASCII 문자와 숫자(Qwen은 한 자리씩 분리)는 1글자당 1토큰, 나머지 ASCII는 3글자당 1토큰에 ESTIMATE_MARGIN을 곱함"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    digits = sum(1 for ch in text if ch.isascii() and ch.isdigit())
+    return int((non_ascii + digits + (len(text) - non_ascii - digits) / 3) * ESTIMATE_MARGIN) + 1
+
+
+def read_modelfile(path: str) -> dict:
+    """Ollama Modelfile에서 PARAMETER 값과 SYSTEM 프롬프트를 읽음 ({"parameters": {...}, "system": str})"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    parameters = {}
+    for key, value in re.findall(r"^\s*PARAMETER\s+(\S+)\s+(.+?)\s*$", text, flags=re.MULTILINE | re.IGNORECASE):
+        parameters[key] = value
+    # SYSTEM """여러 줄""" / SYSTEM '한 줄' / SYSTEM "한 줄" / SYSTEM 한 줄
+    system = ""
+    match = re.search(r'^\s*SYSTEM\s+("""(.*?)"""|\'(.*?)\'|"(.*?)"|(.+?))\s*$', text, flags=re.MULTILINE | re.DOTALL | re.IGNORECASE)
+    if match:
+        system = next(group for group in match.groups()[1:] if group is not None)
+    return {"parameters": parameters, "system": system.strip()}
+
+
+def prompt_budget(context_window: int, num_predict: int, system_prompt: str = "",
+                  count: Callable[[str], int] = estimate_tokens, template_tokens: int = TEMPLATE_TOKENS) -> int:
+    """모델 컨텍스트에서 SYSTEM 프롬프트, 채팅 템플릿, 답변 생성(num_predict) 몫을 뺀 본문 토큰 예산"""
+    budget = context_window - num_predict - template_tokens - (count(system_prompt) if system_prompt else 0)
+    if budget <= 0:
+        raise ValueError(f"본문에 쓸 토큰이 남지 않습니다 (context_window={context_window}, num_predict={num_predict})")
+    return budget
+
+
+def load_token_counter(name: str = DEFAULT_TOKENIZER) -> Callable[[str], int]:
+    """transformers 토크나이저로 정확한 토큰 수 계산 함수 반환 (실패 시 추정 함수)"""
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(name)
+    except Exception as e:
+        print(f"⚠️ 토크나이저 로드 실패, 추정치로 토큰 수 계산: {e}")
+        return estimate_tokens
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+
+class WindowedSummaryMemory:
+    """최근 K턴은 원문, 나머지는 누적 요약으로 보관하고 프롬프트 토큰 상한을 보장"""
+
+    def __init__(self, llm, max_tokens: int = 2048, window_turns: int = 4, summary_tokens: int = 300,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        self.llm = llm
+        self.max_tokens = max_tokens        # render_prompt로 완성한 본문 전체의 상한 (prompt_budget 참고)
+        self.window_turns = window_turns    # 원문으로 유지할 최근 턴 수
+        self.summary_tokens = summary_tokens
+        self.count = count_tokens or load_token_counter()
+
+        self.messages: list = []            # (role, content) : 아직 요약되지 않은 최근 대화
+        self.summary = ""
+        self.folded_turns = 0
+        self.last_prompt_tokens = 0
+
+    def add_user_message(self, content: str) -> None:
+        self.messages.append(("user", content))
+        self._compact()
+
+    def add_ai_message(self, content: str) -> None:
+        self.messages.append(("assistant", content))
+
+    def clear(self) -> None:
+        self.messages, self.summary, self.folded_turns = [], "", 0
+
+    # 요약
+    @staticmethod
+    def _format(messages: list) -> str:
+        return "\n".join(f"{ROLE_LABELS.get(role, role)}: {content}" for role, content in messages)
+
+    def _next_turn_start(self) -> int:
+        """가장 오래된 턴 바로 다음 턴의 시작 위치"""
+        for index, (role, _) in enumerate(self.messages[1:], start=1):
+            if role == "user":
+                return index
+        return len(self.messages)
+
+    def _compact(self) -> None:
+        """원문 턴 수가 window_turns를 넘으면 앞부분을 요약으로 이동"""
+        starts = [index for index, (role, _) in enumerate(self.messages) if role == "user"]
+        if len(starts) > self.window_turns:
+            self._fold(starts[len(starts) - self.window_turns])
+
+    def _fold(self, upto: int) -> None:
+        old, self.messages = self.messages[:upto], self.messages[upto:]
+        if not old:
+            return
+        self.folded_turns += sum(1 for role, _ in old if role == "user")
+        lines = self._format(old)
+        try:
+            result = self.llm.invoke(SUMMARY_PROMPT.format(summary=self.summary or "(없음)", lines=lines, limit=self.summary_tokens))
+            summary = getattr(result, "content", result).strip()
+        except Exception as e:
+            # 요약에 실패해도 내용을 잃지 않도록 원문을 이어붙이고 길이만 제한
+            print(f"⚠️ 대화 요약 실패, 원문을 잘라 보관: {e}")
+            summary = f"{self.summary}\n{lines}".strip()
+        self.summary = self._truncate(summary, self.summary_tokens)
+
+    def _truncate(self, text: str, limit: int) -> str:
+        """limit 토큰 이하가 되도록 앞부분을 잘라냄 (최근 내용을 남김)"""
+        if limit <= 0:
+            return ""
+        if self.count(text) <= limit:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high) // 2
+            if self.count(text[middle:]) <= limit:
+                high = middle
+            else:
+                low = middle + 1
+        return text[low:]
+
+    # 렌더링
+    def render(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append(f"[이전 대화 요약]\n{self.summary}")
+        if self.messages:
+            parts.append(f"[최근 대화]\n{self._format(self.messages)}")
+        return "\n\n".join(parts)
+
+    def render_prompt(self, build: Callable[[str], str]) -> str:
+        """build(메모리 문자열)로 만든 프롬프트가 max_tokens 이하가 될 때까지 메모리를 줄임"""
+        prompt = build(self.render())
+        tokens = self.count(prompt)
+
+        # 1. 오래된 턴부터 요약으로 이동
+        while tokens > self.max_tokens and self.messages:
+            self._fold(self._next_turn_start())
+            prompt = build(self.render())
+            tokens = self.count(prompt)
+
+        # 2. 요약을 초과분만큼 잘라냄
+        while tokens > self.max_tokens and self.summary:
+            self.summary = self._truncate(self.summary, self.count(self.summary) - (tokens - self.max_tokens) - 1)
+            prompt = build(self.render())
+            tokens = self.count(prompt)
+
+        if tokens > self.max_tokens:
+            print(f"⚠️ 메모리 없이도 프롬프트가 {tokens}토큰으로 상한({self.max_tokens})을 넘습니다")
+        self.last_prompt_tokens = tokens
+        return prompt
+
+    def stats(self) -> dict:
+        return {
+            "recent_messages": len(self.messages),
+            "folded_turns": self.folded_turns,
+            "summary_tokens": self.count(self.summary) if self.summary else 0,
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "max_tokens": self.max_tokens,
+        }
@@ -0,0 +1,201 @@
+'''
+메모리 상한이 있는 MemorySaver (LRU 스필 + 폴트 인)
+ - MemorySaver는 모든 thread의 모든 체크포인트를 프로세스 메모리에 무제한 보관
+   => 오래 실행되는 서비스는 결국 메모리 부족
+ - BoundedMemorySaver
+    1. 직렬화된 체크포인트/쓰기/채널 값의 바이트 수를 thread 단위로 집계
+    2. 합계가 max_bytes를 넘으면 가장 오래 사용하지 않은 thread를 통째로 디스크(spill_dir)로 내보냄
+    3. get_state / invoke 등으로 그 thread에 다시 접근하면 디스크에서 읽어 메모리로 복원(fault-in)
+ - stats()로 메모리 상주 thread 수/바이트, 스필/폴트 횟수 확인
+
+ # 사용
+    memory = BoundedMemorySaver(max_bytes=256 * 1024 * 1024)
+    app = workflow.compile(checkpointer=memory)
+    print(memory.stats())
+'''
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Optional
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+
+def _typed_size(value) -> int:
+    """(type, bytes) 형태로 직렬화된 값의 크기"""
+    return len(value[1]) if value and value[1] else 0
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """max_bytes를 넘으면 LRU thread를 spill_dir로 내보내는 InMemorySaver"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, spill_dir: Optional[str] = None, *, serde=None):
+        super().__init__(serde=serde)
+        self.max_bytes = max_bytes
+        # spill_dir를 지정하지 않으면 임시 폴더를 만들고 close() 시 삭제
+        self._own_spill_dir = spill_dir is None
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix="checkpoints-spill-")
+        os.makedirs(self.spill_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._resident: OrderedDict = OrderedDict()   # thread_id -> 바이트 (LRU 순서)
+        self._blob_keys = defaultdict(set)            # thread_id -> blobs 키 (thread 단위로 빠르게 내보내기 위함)
+        self._write_keys = defaultdict(set)           # thread_id -> writes 키
+        self._spilled: dict = {}                      # thread_id -> (파일 경로, 바이트)
+        self.resident_bytes = 0
+        self.spills = 0
+        self.faults = 0
+        self.spilled_bytes = 0
+
+    # 메모리 집계 / LRU
+    def _charge(self, thread_id: str, size: int) -> None:
+        self._resident[thread_id] = self._resident.get(thread_id, 0) + size
+        self._resident.move_to_end(thread_id)
+        self.resident_bytes += size
+
+    def _touch(self, thread_id: str) -> None:
+        """접근한 thread를 LRU 맨 뒤로, 디스크에 있으면 먼저 복원"""
+        if thread_id in self._spilled:
+            self._fault_in(thread_id)
+        elif thread_id in self._resident:
+            self._resident.move_to_end(thread_id)
+
+    def _evict(self, keep: str) -> None:
+        """상한을 넘는 동안 LRU thread를 내보냄 (방금 사용한 thread는 제외)"""
+        while self.resident_bytes > self.max_bytes and len(self._resident) > 1:
+            thread_id = next(iter(self._resident))
+            if thread_id == keep:
+                self._resident.move_to_end(thread_id)
+                continue
+            self._spill(thread_id)
+
+    def _spill_path(self, thread_id: str) -> str:
+        return os.path.join(self.spill_dir, hashlib.sha1(str(thread_id).encode()).hexdigest() + ".pkl")
+
+    def _spill(self, thread_id: str) -> None:
+        size = self._resident.pop(thread_id)
+        blob_keys, write_keys = self._blob_keys.pop(thread_id, set()), self._write_keys.pop(thread_id, set())
+        # 메모리에는 이미 직렬화된 (type, bytes)만 있으므로 그대로 pickle
+        payload = {
+            "storage": {ns: dict(items) for ns, items in self.storage.pop(thread_id, {}).items()},
+            "writes": {key: self.writes.pop(key) for key in write_keys if key in self.writes},
+            "blobs": {key: self.blobs.pop(key) for key in blob_keys if key in self.blobs},
+        }
+        path = self._spill_path(thread_id)
+        with open(path, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._spilled[thread_id] = (path, size)
+        self.resident_bytes -= size
+        self.spills += 1
+        self.spilled_bytes += size
+
+    def _fault_in(self, thread_id: str) -> None:
+        path, size = self._spilled.pop(thread_id)
+        # 이 클래스가 직접 쓴 파일만 읽음
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+        os.remove(path)
+        for ns, items in payload["storage"].items():
+            self.storage[thread_id][ns].update(items)
+        self.writes.update(payload["writes"])
+        self.blobs.update(payload["blobs"])
+        self._write_keys[thread_id].update(payload["writes"])
+        self._blob_keys[thread_id].update(payload["blobs"])
+        self.faults += 1
+        self.spilled_bytes -= size
+        self._charge(thread_id, size)
+        self._evict(keep=thread_id)
+
+    # InMemorySaver 오버라이드
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            self._touch(thread_id)
+            checkpoint_tuple = super().get_tuple(config)
+            if not any(self.storage.get(thread_id, {}).values()):
+                self.storage.pop(thread_id, None)  # 없는 thread 조회 시 defaultdict가 만든 빈 항목 정리
+            return checkpoint_tuple
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        if config is not None:
+            with self._lock:
+                self._touch(config["configurable"]["thread_id"])
+                checkpoint_tuples = list(super().list(config, filter=filter, before=before, limit=limit))
+            yield from checkpoint_tuples
+            return
+
+        # 전체 조회 : 스필된 thread까지 하나씩 복원하며 조회 (한 번에 모두 메모리에 올리지 않음)
+        with self._lock:
+            thread_ids = [*self._resident, *self._spilled]
+        for thread_id in thread_ids:
+            for checkpoint_tuple in self.list({"configurable": {"thread_id": thread_id}}, filter=filter, before=before, limit=limit):
+                yield checkpoint_tuple
+                if limit is not None:
+                    limit -= 1
+                    if limit <= 0:
+                        return
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            self._touch(thread_id)
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+
+            blob_keys = [(thread_id, checkpoint_ns, channel, version) for channel, version in new_versions.items()]
+            self._blob_keys[thread_id].update(blob_keys)
+            saved, saved_metadata, _ = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            size = _typed_size(saved) + _typed_size(saved_metadata) + sum(_typed_size(self.blobs[key]) for key in blob_keys)
+            self._charge(thread_id, size)
+            self._evict(keep=thread_id)
+            return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        outer_key = (thread_id, config["configurable"].get("checkpoint_ns", ""), config["configurable"]["checkpoint_id"])
+        with self._lock:
+            self._touch(thread_id)
+            before = sum(_typed_size(value[2]) for value in self.writes.get(outer_key, {}).values())
+            super().put_writes(config, writes, task_id, task_path)
+            after = sum(_typed_size(value[2]) for value in self.writes.get(outer_key, {}).values())
+            self._write_keys[thread_id].add(outer_key)
+            self._charge(thread_id, after - before)
+            self._evict(keep=thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            if thread_id in self._spilled:
+                path, size = self._spilled.pop(thread_id)
+                os.remove(path)
+                self.spilled_bytes -= size
+            self.resident_bytes -= self._resident.pop(thread_id, 0)
+            self.storage.pop(thread_id, None)
+            for key in self._write_keys.pop(thread_id, set()):
+                self.writes.pop(key, None)
+            for key in self._blob_keys.pop(thread_id, set()):
+                self.blobs.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resident_threads": len(self._resident),
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "spilled_threads": len(self._spilled),
+                "spilled_bytes": self.spilled_bytes,
+                "spills": self.spills,
+                "faults": self.faults,
+            }
+
+    def close(self) -> None:
+        """임시 스필 폴더 정리"""
+        if self._own_spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return super().__exit__(*exc_info)
@@ -0,0 +1,192 @@
+'''
+자주 쓰는 thread의 최신 체크포인트 읽기 캐시 (read-through + write-through)
+ - app.invoke / app.get_state 는 매번 체크포인터에서 최신 체크포인트를 읽고 역직렬화함
+   => 2초 전에 대화한 고객의 다음 턴도 DB 조회 + 역직렬화를 다시 수행
+ - CachedCheckpointSaver
+    1. put 시 저장한 체크포인트를 thread별 최신 값으로 메모리에 보관 (write-through)
+    2. checkpoint_id 없는 get_tuple(=최신 조회)이면 캐시에서 바로 반환, 없으면 내부 체크포인터 조회 후 보관 (read-through)
+    3. put_writes 가 오면 해당 체크포인트의 pending writes가 바뀌므로 쓰기 전후로 캐시에서 제거
+    4. LRU + 바이트 상한(max_bytes)으로 오래 안 쓴 thread부터 제거
+ - 같은 DB에 쓰는 프로세스가 하나일 때만 사용 (다른 프로세스의 쓰기는 캐시가 알 수 없음)
+
+ # 사용
+    with TunedSqliteSaver.from_conn_string("db/checkpoints.db") as saver:
+        checkpointer = CachedCheckpointSaver(saver, max_bytes=64 * 1024 * 1024)
+        app = workflow.compile(checkpointer=checkpointer)
+        print(checkpointer.stats())
+'''
+import threading
+from collections import OrderedDict
+
+from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple, copy_checkpoint, get_checkpoint_metadata
+
+
+def estimate_size(value, _depth: int = 0) -> int:
+    """직렬화 없이 대략적인 메모리 크기 추정 (문자열 길이 위주)"""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, BaseMessage):
+        return estimate_size(value.content, _depth + 1) + 64
+    if _depth > 8:
+        return 64
+    if isinstance(value, dict):
+        return sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items()) + 64
+    if isinstance(value, (list, tuple, set)):
+        return sum(estimate_size(v, _depth + 1) for v in value) + 64
+    return 32
+
+
+class CachedCheckpointSaver(BaseCheckpointSaver):
+    """내부 체크포인터 앞에 thread별 최신 체크포인트 캐시를 둠"""
+
+    def __init__(self, saver: BaseCheckpointSaver, max_bytes: int = 64 * 1024 * 1024, max_threads: int = 10_000):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.max_bytes = max_bytes
+        self.max_threads = max_threads
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()  # (thread_id, ns) -> (CheckpointTuple, 바이트)
+        self.cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def config_specs(self) -> list:
+        return self.saver.config_specs
+
+    # 캐시 관리
+    @staticmethod
+    def _key(config) -> tuple:
+        configurable = config["configurable"]
+        return str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+
+    def _store(self, checkpoint_tuple: CheckpointTuple) -> None:
+        key = self._key(checkpoint_tuple.config)
+        size = estimate_size(checkpoint_tuple.checkpoint["channel_values"]) + estimate_size(checkpoint_tuple.pending_writes or [])
+        if size > self.max_bytes:
+            self._drop(key)
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.cached_bytes -= old[1]
+            self._entries[key] = (checkpoint_tuple, size)
+            self.cached_bytes += size
+            while self.cached_bytes > self.max_bytes or len(self._entries) > self.max_threads:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.cached_bytes -= evicted_size
+                self.evictions += 1
+
+    def _drop(self, key: tuple) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.cached_bytes -= old[1]
+
+    def _lookup(self, config):
+        """최신 조회(또는 캐시된 최신 id와 같은 id 조회)면 캐시에서 반환"""
+        key = self._key(config)
+        checkpoint_id = config["configurable"].get("checkpoint_id")
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and checkpoint_id in (None, entry[0].config["configurable"]["checkpoint_id"]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                cached = entry[0]
+                # 호출 측이 체크포인트를 수정해도 캐시가 바뀌지 않도록 복사본 반환
+                return cached._replace(checkpoint=copy_checkpoint(cached.checkpoint),
+                                       pending_writes=list(cached.pending_writes or []))
+            self.misses += 1
+        return None
+
+    def _after_put(self, config, checkpoint, metadata, next_config) -> None:
+        parent_config = config if config["configurable"].get("checkpoint_id") else None
+        self._store(CheckpointTuple(
+            config=next_config,
+            checkpoint=copy_checkpoint(checkpoint),
+            metadata=get_checkpoint_metadata(config, metadata),
+            parent_config=parent_config,
+            pending_writes=[],
+        ))
+
+    # 동기 API
+    def get_tuple(self, config):
+        cached = self._lookup(config)
+        if cached is not None:
+            return cached
+        checkpoint_tuple = self.saver.get_tuple(config)
+        if checkpoint_tuple is not None and not config["configurable"].get("checkpoint_id"):
+            self._store(checkpoint_tuple)
+        return checkpoint_tuple
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        next_config = self.saver.put(config, checkpoint, metadata, new_versions)
+        self._after_put(config, checkpoint, metadata, next_config)
+        return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        # 쓰는 도중 get_tuple이 pending writes 없는 튜플을 다시 캐시할 수 있으므로 쓰기 후에도 제거
+        self._drop(self._key(config))
+        try:
+            self.saver.put_writes(config, writes, task_id, task_path)
+        finally:
+            self._drop(self._key(config))
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == str(thread_id)]:
+                self.cached_bytes -= self._entries.pop(key)[1]
+        self.saver.delete_thread(thread_id)
+
+    # 비동기 API (내부 체크포인터의 비동기 메서드 사용)
+    async def aget_tuple(self, config):
+        cached = self._lookup(config)
+        if cached is not None:
+            return cached
+        checkpoint_tuple = await self.saver.aget_tuple(config)
+        if checkpoint_tuple is not None and not config["configurable"].get("checkpoint_id"):
+            self._store(checkpoint_tuple)
+        return checkpoint_tuple
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        async for checkpoint_tuple in self.saver.alist(config, filter=filter, before=before, limit=limit):
+            yield checkpoint_tuple
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        next_config = await self.saver.aput(config, checkpoint, metadata, new_versions)
+        self._after_put(config, checkpoint, metadata, next_config)
+        return next_config
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        self._drop(self._key(config))
+        try:
+            await self.saver.aput_writes(config, writes, task_id, task_path)
+        finally:
+            self._drop(self._key(config))
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == str(thread_id)]:
+                self.cached_bytes -= self._entries.pop(key)[1]
+        await self.saver.adelete_thread(thread_id)
+
+    def get_next_version(self, current, channel):
+        return self.saver.get_next_version(current, channel)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "cached_bytes": self.cached_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,201 @@
+'''
+체크포인트 압축 직렬화기 (serde)
+ - research_data / analysis_result / draft_content / final_report 같은 긴 텍스트가
+   체크포인트마다 압축 없이 저장됨 => 디스크 I/O, 페이지 캐시 낭비
+ - CompressedSerializer
+    1. 기존 직렬화(JsonPlusSerializer, msgpack 바이너리) 결과를 압축
+    2. 처음 train_samples개의 체크포인트로 사전(dictionary)을 학습 => 작은 체크포인트도 잘 압축됨
+       (zstandard 설치 시 zstd 사전 학습, 없으면 zlib 미리 채운 사전(zdict) 사용)
+    3. 헤더(매직 + 포맷 버전 + 코덱 + 사전 id)를 붙이고 type에 "+cz"를 붙여 저장
+       => 기존 행(압축 전)은 그대로 읽힘, 사전은 dict_dir에 파일로 보관
+ - stats()로 압축률, 압축/해제 CPU 시간, 실제 기록 바이트 확인
+
+ # 사용
+    serde = CompressedSerializer(dict_dir="db/serde_dicts")
+    with TunedSqliteSaver.from_conn_string("db/checkpoints.db", serde=serde) as checkpointer:
+        app = workflow.compile(checkpointer=checkpointer)
+        print(serde.stats())
+'''
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Optional
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"CZ"
+FORMAT_VERSION = 1
+TYPE_SUFFIX = "+cz"
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+_CODEC_NAMES = {CODEC_ZLIB: "zlib", CODEC_ZSTD: "zstd"}
+# 매직(2) + 포맷 버전(1) + 코덱(1) + 사전 id(4, 0이면 사전 없음)
+_HEADER = struct.Struct(">2sBBI")
+_ZLIB_WINDOW = 32 * 1024  # zlib 사전은 최대 32KB까지만 사용됨
+
+
+class CompressedSerializer:
+    """inner serde의 결과를 (사전 학습) 압축해서 저장하는 serde"""
+
+    def __init__(self, inner=None, dict_dir: Optional[str] = "db/serde_dicts", codec: Optional[str] = None,
+                 level: int = 3, min_size: int = 256, train_samples: int = 200, dict_size: int = 16 * 1024):
+        self.inner = inner or JsonPlusSerializer()
+        self.dict_dir = dict_dir
+        if codec is None:
+            codec = "zstd" if zstandard is not None else "zlib"
+        if codec == "zstd" and zstandard is None:
+            raise ImportError("codec='zstd'는 zstandard 패키지가 필요합니다 (pip install zstandard)")
+        self.codec = CODEC_ZSTD if codec == "zstd" else CODEC_ZLIB
+        self.level = level
+        self.min_size = min_size            # 이보다 작은 페이로드는 압축하지 않음
+        self.train_samples = train_samples if dict_dir else 0
+        self.dict_size = dict_size
+
+        self._lock = threading.Lock()
+        self._samples: list = []
+        self._dicts: dict = {}               # 사전 id -> 사전 bytes
+        self._active_dict_id = 0
+        self._load_latest_dict()
+
+        self.raw_bytes = 0
+        self.written_bytes = 0
+        self.compressed = 0
+        self.passthrough = 0
+        self.compress_seconds = 0.0
+        self.decompress_seconds = 0.0
+
+    # 사전 관리
+    def _dict_path(self, codec: int, dict_id: int) -> str:
+        return os.path.join(self.dict_dir, f"{_CODEC_NAMES[codec]}-{dict_id:08x}.dict")
+
+    def _load_latest_dict(self) -> None:
+        """재시작 시 이전에 학습한 사전을 이어서 사용 (같은 코덱 중 가장 최근 파일)"""
+        if not self.dict_dir or not os.path.isdir(self.dict_dir):
+            return
+        prefix = _CODEC_NAMES[self.codec] + "-"
+        paths = [os.path.join(self.dict_dir, name) for name in os.listdir(self.dict_dir)
+                 if name.startswith(prefix) and name.endswith(".dict")]
+        if paths:
+            latest = max(paths, key=os.path.getmtime)
+            self._active_dict_id = int(os.path.basename(latest)[len(prefix):-len(".dict")], 16)
+            with open(latest, "rb") as f:
+                self._dicts[self._active_dict_id] = f.read()
+            self.train_samples = 0
+
+    def _get_dict(self, codec: int, dict_id: int) -> bytes:
+        if dict_id not in self._dicts:
+            path = self._dict_path(codec, dict_id) if self.dict_dir else None
+            if not path or not os.path.exists(path):
+                raise ValueError(f"압축 사전을 찾을 수 없음: {_CODEC_NAMES[codec]}-{dict_id:08x} (dict_dir={self.dict_dir})")
+            with open(path, "rb") as f:
+                self._dicts[dict_id] = f.read()
+        return self._dicts[dict_id]
+
+    def _train(self, samples: list) -> None:
+        if self.codec == CODEC_ZSTD:
+            dict_bytes = zstandard.train_dictionary(self.dict_size, samples).as_bytes()
+        else:
+            # zlib은 학습 기능이 없으므로 최근 샘플을 이어붙여 사전으로 사용 (뒤쪽일수록 짧은 거리로 참조됨)
+            dict_bytes = b"".join(samples)[-min(self.dict_size, _ZLIB_WINDOW):]
+        dict_id = zlib.crc32(dict_bytes) or 1
+        os.makedirs(self.dict_dir, exist_ok=True)
+        with open(self._dict_path(self.codec, dict_id), "wb") as f:
+            f.write(dict_bytes)
+        self._dicts[dict_id] = dict_bytes
+        self._active_dict_id = dict_id
+        print(f"[Serde] {_CODEC_NAMES[self.codec]} 사전 학습 완료 (샘플 {len(samples)}개, {len(dict_bytes)} bytes)")
+
+    def _collect(self, data: bytes) -> None:
+        with self._lock:
+            if not self.train_samples or self._active_dict_id:
+                return
+            self._samples.append(data)
+            if len(self._samples) >= self.train_samples:
+                samples, self._samples = self._samples, []
+                try:
+                    self._train(samples)
+                except Exception as e:
+                    # 샘플이 너무 적거나 비슷하면 zstd 학습이 실패할 수 있음 => 사전 없이 계속
+                    print(f"[Serde] 사전 학습 실패, 사전 없이 압축: {e}")
+                    self.train_samples = 0
+
+    # 압축/해제
+    def _compress(self, data: bytes, dict_id: int) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            dict_data = zstandard.ZstdCompressionDict(self._dicts[dict_id]) if dict_id else None
+            return zstandard.ZstdCompressor(level=self.level, dict_data=dict_data).compress(data)
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, **({"zdict": self._dicts[dict_id]} if dict_id else {}))
+        return compressor.compress(data) + compressor.flush()
+
+    def _decompress(self, codec: int, dict_id: int, body: bytes) -> bytes:
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise ImportError("zstd로 압축된 체크포인트를 읽으려면 zstandard 패키지가 필요합니다")
+            dict_data = zstandard.ZstdCompressionDict(self._get_dict(codec, dict_id)) if dict_id else None
+            return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(body)
+        decompressor = zlib.decompressobj(-15, **({"zdict": self._get_dict(codec, dict_id)} if dict_id else {}))
+        return decompressor.decompress(body) + decompressor.flush()
+
+    def dumps_typed(self, obj: Any) -> tuple:
+        type_, data = self.inner.dumps_typed(obj)
+        self.raw_bytes += len(data)
+        if len(data) < self.min_size:
+            self.passthrough += 1
+            self.written_bytes += len(data)
+            return type_, data
+
+        self._collect(data)
+        dict_id = self._active_dict_id
+        start = time.perf_counter()
+        body = self._compress(data, dict_id)
+        self.compress_seconds += time.perf_counter() - start
+        if len(body) + _HEADER.size >= len(data):
+            # 압축 효과가 없으면 원본 저장
+            self.passthrough += 1
+            self.written_bytes += len(data)
+            return type_, data
+
+        self.compressed += 1
+        payload = _HEADER.pack(MAGIC, FORMAT_VERSION, self.codec, dict_id) + body
+        self.written_bytes += len(payload)
+        return type_ + TYPE_SUFFIX, payload
+
+    def loads_typed(self, data: tuple) -> Any:
+        type_, payload = data
+        if not type_.endswith(TYPE_SUFFIX):
+            return self.inner.loads_typed(data)  # 압축 전에 저장된 행
+
+        magic, version, codec, dict_id = _HEADER.unpack_from(payload)
+        if magic != MAGIC or version > FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 체크포인트 포맷: magic={magic!r}, version={version}")
+        start = time.perf_counter()
+        raw = self._decompress(codec, dict_id, payload[_HEADER.size:])
+        self.decompress_seconds += time.perf_counter() - start
+        return self.inner.loads_typed((type_[:-len(TYPE_SUFFIX)], raw))
+
+    # JsonPlusSerializer와 같은 인터페이스 (구버전 체크포인터 호환)
+    def dumps(self, obj: Any) -> bytes:
+        return self.inner.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(data)
+
+    def stats(self) -> dict:
+        return {
+            "codec": _CODEC_NAMES[self.codec],
+            "dict_id": f"{self._active_dict_id:08x}" if self._active_dict_id else None,
+            "compressed": self.compressed,
+            "passthrough": self.passthrough,
+            "raw_bytes": self.raw_bytes,
+            "written_bytes": self.written_bytes,
+            "ratio": self.raw_bytes / self.written_bytes if self.written_bytes else 1.0,
+            "compress_seconds": self.compress_seconds,
+            "decompress_seconds": self.decompress_seconds,
+        }
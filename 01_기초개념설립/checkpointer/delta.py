@@ -0,0 +1,177 @@
+'''
+append 전용 채널을 델타로 저장하는 SQLite 체크포인터
+ - messages: Annotated[list, operator.add] 채널은 superstep마다 리스트 전체가 다시 직렬화됨
+   => 대화 턴 수 n에 대해 저장량/쓰기 시간이 n^2 으로 증가
+ - DeltaSqliteSaver
+    1. 부모 체크포인트 이후 새로 붙은 항목만 {"__delta__": 부모 id, "depth", "items"} 형태로 저장
+    2. snapshot_every 번마다 리스트 전체를 저장(스냅샷) => 읽을 때 따라가는 체인 길이 상한
+    3. get_state / get_state_history 시 스냅샷 + 델타를 이어붙여 원래 리스트로 복원
+ - 앞부분이 바뀐 경우(메시지 삭제/수정 등)는 델타로 표현할 수 없으므로 자동으로 전체 저장
+
+ # 사용
+    with DeltaSqliteSaver.from_conn_string("db/checkpoints.db", snapshot_every=20) as checkpointer:
+        app = workflow.compile(checkpointer=checkpointer)
+        print(checkpointer.stats())
+'''
+import threading
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+from checkpointer.sqlite_tuned import TunedSqliteSaver
+
+DELTA_KEY = "__delta__"
+
+
+def _is_delta(value) -> bool:
+    return isinstance(value, dict) and DELTA_KEY in value
+
+
+class DeltaSqliteSaver(TunedSqliteSaver):
+    """append 전용 채널(messages 등)을 부모 대비 델타로 저장하는 체크포인터"""
+
+    def __init__(self, conn, *, append_channels: tuple = ("messages",), snapshot_every: int = 20,
+                 cache_size: int = 256, page_size: int = 100, **kwargs):
+        super().__init__(conn, **kwargs)
+        self.append_channels = tuple(append_channels)
+        self.snapshot_every = max(1, snapshot_every)
+        self.cache_size = cache_size
+        self.page_size = page_size
+
+        # (thread_id, ns, checkpoint_id, channel) -> (복원된 전체 리스트, 델타 깊이)
+        self._values: OrderedDict = OrderedDict()
+        self._values_lock = threading.Lock()
+        self.snapshots = 0
+        self.deltas = 0
+        self.replayed_rows = 0
+
+    # 복원 결과 캐시 (같은 스레드의 다음 put / 히스토리 조회에서 재사용)
+    def _cached(self, key: tuple) -> Optional[tuple]:
+        with self._values_lock:
+            entry = self._values.get(key)
+            if entry is not None:
+                self._values.move_to_end(key)
+            return entry
+
+    def _remember(self, key: tuple, full: list, depth: int) -> None:
+        with self._values_lock:
+            self._values[key] = (full, depth)
+            self._values.move_to_end(key)
+            while len(self._values) > self.cache_size:
+                self._values.popitem(last=False)
+
+    def _load_channel(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, channel: str):
+        """저장된 행에서 채널 값(델타일 수도 있음)만 읽음"""
+        with self.cursor(transaction=False) as cur:
+            cur.execute(
+                "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+            row = cur.fetchone()
+        if row is None:
+            return None
+        self.replayed_rows += 1
+        return self.serde.loads_typed(row)["channel_values"].get(channel)
+
+    def _full_value(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, channel: str) -> Optional[tuple]:
+        """checkpoint_id 시점의 채널 전체 리스트와 델타 깊이 반환 (스냅샷까지 체인을 거슬러 올라감)"""
+        chain = []  # (checkpoint_id, 델타) : 최신 → 과거
+        cid, base = checkpoint_id, None
+        while cid is not None:
+            cached = self._cached((thread_id, checkpoint_ns, cid, channel))
+            if cached is not None:
+                base = cached
+                break
+            value = self._load_channel(thread_id, checkpoint_ns, cid, channel)
+            if _is_delta(value):
+                chain.append((cid, value))
+                cid = value[DELTA_KEY]
+            elif isinstance(value, list):
+                base = (value, 0)
+                self._remember((thread_id, checkpoint_ns, cid, channel), value, 0)
+                break
+            else:
+                return None
+        if base is None:
+            return None  # 체인 중간의 체크포인트가 삭제됨
+
+        # 과거 → 최신 순으로 델타를 이어붙이면서 중간 시점도 캐시
+        full, depth = base
+        for cid, delta in reversed(chain):
+            full, depth = full + delta["items"], delta["depth"]
+            self._remember((thread_id, checkpoint_ns, cid, channel), full, depth)
+        return full, depth
+
+    def _encode(self, thread_id: str, checkpoint_ns: str, parent_id: Optional[str],
+                checkpoint_id: str, channel: str, full: list):
+        """부모 리스트가 현재 리스트의 앞부분이면 델타, 아니면 전체 저장"""
+        full = list(full)
+        encoded, depth = full, 0
+        base = self._full_value(thread_id, checkpoint_ns, parent_id, channel) if parent_id else None
+        if base is not None:
+            old, old_depth = base
+            if old_depth + 1 < self.snapshot_every and len(full) >= len(old) and full[:len(old)] == old:
+                depth = old_depth + 1
+                encoded = {DELTA_KEY: parent_id, "depth": depth, "items": full[len(old):]}
+        if depth:
+            self.deltas += 1
+        else:
+            self.snapshots += 1
+        self._remember((thread_id, checkpoint_ns, checkpoint_id, channel), full, depth)
+        return encoded
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        configurable = config["configurable"]
+        thread_id = str(configurable["thread_id"])
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        parent_id = configurable.get("checkpoint_id")
+
+        values = dict(checkpoint["channel_values"])
+        for channel in self.append_channels:
+            if isinstance(values.get(channel), list):
+                values[channel] = self._encode(thread_id, checkpoint_ns, parent_id, checkpoint["id"], channel, values[channel])
+        # 원본 checkpoint는 그래프가 계속 사용하므로 복사본에만 델타를 넣음
+        return super().put(config, {**checkpoint, "channel_values": values}, metadata, new_versions)
+
+    def _expand(self, checkpoint_tuple):
+        configurable = checkpoint_tuple.config["configurable"]
+        thread_id, checkpoint_ns = str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+        values = checkpoint_tuple.checkpoint["channel_values"]
+        for channel in self.append_channels:
+            delta = values.get(channel)
+            if not _is_delta(delta):
+                continue
+            base = self._full_value(thread_id, checkpoint_ns, delta[DELTA_KEY], channel)
+            if base is None:
+                raise ValueError(f"델타 체인이 끊어짐: thread_id={thread_id}, checkpoint_id={configurable['checkpoint_id']}")
+            full = base[0] + delta["items"]
+            self._remember((thread_id, checkpoint_ns, configurable["checkpoint_id"], channel), full, delta["depth"])
+            values[channel] = full
+        return checkpoint_tuple
+
+    def get_tuple(self, config):
+        checkpoint_tuple = super().get_tuple(config)
+        return self._expand(checkpoint_tuple) if checkpoint_tuple else None
+
+    def list(self, config, *, filter=None, before=None, limit=None) -> Iterator:
+        # 부모 행 조회가 같은 연결/락을 쓰므로 page_size개씩 먼저 읽은 뒤 복원 (전체를 메모리에 올리지 않음)
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_limit = self.page_size if remaining is None else min(self.page_size, remaining)
+            page = list(super().list(config, filter=filter, before=before, limit=page_limit))
+            for checkpoint_tuple in page:
+                yield self._expand(checkpoint_tuple)
+            if len(page) < page_limit:
+                return
+            if remaining is not None:
+                remaining -= len(page)
+            before = {"configurable": {"checkpoint_id": page[-1].config["configurable"]["checkpoint_id"]}}
+
+    def stats(self) -> dict:
+        total = self.snapshots + self.deltas
+        return {
+            "snapshots": self.snapshots,
+            "deltas": self.deltas,
+            "delta_ratio": self.deltas / total if total else 0.0,
+            "replayed_rows": self.replayed_rows,
+            "cached_values": len(self._values),
+        }
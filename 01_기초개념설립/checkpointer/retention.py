@@ -0,0 +1,295 @@
+'''
+체크포인트 보존 정책 + 압축(compaction) + 점진적 vacuum
+ - 체크포인터는 모든 thread의 모든 superstep을 영구 저장 => db/checkpoints.db 가 계속 커짐
+ - RetentionPolicy
+    1. keep_last     : thread별 최근 N개 체크포인트만 유지
+    2. max_age       : 일정 시간이 지난 히스토리 삭제 (thread의 최신 체크포인트는 유지)
+    3. idle_ttl      : 마지막 체크포인트 이후 오래 사용되지 않은 thread는 통째로 삭제
+ - checkpoint_id(uuid6)는 생성 시각 순으로 정렬되므로 시간 조건도 인덱스(PK) 범위 조건으로 처리
+ - 작은 배치로 나눠 삭제 + 배치마다 commit => 실행 중인 그래프의 쓰기를 오래 막지 않음
+ - DeltaSqliteSaver로 저장된 DB면, 남는 체크포인트 중 삭제될 부모를 참조하는 델타를 스냅샷으로 바꾼 뒤 삭제
+
+ # 사용 (CLI)
+    python 01_기초개념설립/checkpointer/retention.py db/checkpoints.db --keep-last 20 --max-age-days 30 --idle-days 90 --vacuum
+    python 01_기초개념설립/checkpointer/retention.py db/checkpoints.db --keep-last 20 --every 600   # 10분마다 반복
+
+ # 사용 (백그라운드)
+    job = RetentionJob("db/checkpoints.db", RetentionPolicy(keep_last=20, idle_ttl=90 * 86400), interval=600)
+    job.start()
+'''
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+if __name__ == "__main__":
+    # CLI로 직접 실행할 때도 checkpointer 패키지를 찾을 수 있도록
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkpointer.delta import DELTA_KEY, DeltaSqliteSaver
+
+# uuid6 타임스탬프 기준점 (1582-10-15, 100ns 단위)
+_UUID_EPOCH = 0x01B21DD213814000
+
+
+def checkpoint_id_at(unix_time: float) -> str:
+    """해당 시각에 생성된 가장 작은 checkpoint_id (이 값보다 작으면 그 이전에 생성된 체크포인트)"""
+    t = int(unix_time * 10_000_000) + _UUID_EPOCH
+    return f"{t >> 28:08x}-{(t >> 12) & 0xFFFF:04x}-6{t & 0xFFF:03x}-0000-000000000000"
+
+
+def checkpoint_time(checkpoint_id: str) -> float:
+    """checkpoint_id(uuid6)에서 생성 시각(unix time) 추출"""
+    value = int(checkpoint_id.replace("-", ""), 16)
+    t = ((value >> 80) << 12) | ((value >> 64) & 0xFFF)
+    return (t - _UUID_EPOCH) / 10_000_000
+
+
+class RetentionPolicy:
+    """None인 항목은 적용하지 않음 (시간 단위 : 초)"""
+
+    def __init__(self, keep_last: Optional[int] = None, max_age: Optional[float] = None,
+                 idle_ttl: Optional[float] = None, delta_channels: tuple = ("messages",)):
+        if keep_last is not None and keep_last < 1:
+            raise ValueError("keep_last는 1 이상이어야 합니다 (thread 전체 삭제는 idle_ttl 사용)")
+        self.keep_last = keep_last
+        self.max_age = max_age
+        self.idle_ttl = idle_ttl
+        self.delta_channels = tuple(delta_channels)
+
+
+class Compactor:
+    """별도 연결로 보존 정책을 적용 (배치 삭제 + 점진적 vacuum)"""
+
+    def __init__(self, db_path: str, policy: RetentionPolicy, batch_size: int = 500,
+                 pause: float = 0.01, serde=None):
+        self.db_path = db_path
+        self.policy = policy
+        self.batch_size = batch_size
+        self.pause = pause  # 배치 사이 대기 => 실행 중인 writer가 락을 잡을 틈을 줌
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript("PRAGMA busy_timeout=5000; PRAGMA synchronous=NORMAL;")
+        # 델타 체인 복원/재인코딩은 DeltaSqliteSaver 로직을 그대로 사용 (그룹 커밋/읽기 풀 없이)
+        self.saver = DeltaSqliteSaver(self.conn, append_channels=policy.delta_channels,
+                                      commit_interval=0, readers=0, serde=serde)
+        self.saver.setup()
+
+    def _delete_batched(self, table: str, where: str, params: tuple) -> int:
+        deleted = 0
+        while True:
+            with self.saver.lock:
+                cur = self.conn.execute(
+                    f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT ?)",
+                    (*params, self.batch_size),
+                )
+                self.conn.commit()
+            deleted += cur.rowcount
+            if cur.rowcount < self.batch_size:
+                return deleted
+            time.sleep(self.pause)
+
+    def _rebase_deltas(self, thread_id: str, checkpoint_ns: str, cut: str) -> int:
+        """cut 이전 체크포인트를 부모로 참조하는 남은 델타를 전체 값(스냅샷)으로 바꿔 저장"""
+        if not self.policy.delta_channels:
+            return 0
+        rows = self.conn.execute(
+            "SELECT checkpoint_id, type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id >= ? ORDER BY checkpoint_id",
+            (thread_id, checkpoint_ns, cut),
+        ).fetchall()
+        rebased = 0
+        for checkpoint_id, type_, blob in rows:
+            checkpoint = self.saver.serde.loads_typed((type_, blob))
+            values = checkpoint["channel_values"]
+            changed = False
+            for channel in self.policy.delta_channels:
+                delta = values.get(channel)
+                if isinstance(delta, dict) and DELTA_KEY in delta and delta[DELTA_KEY] < cut:
+                    base = self.saver._full_value(thread_id, checkpoint_ns, delta[DELTA_KEY], channel)
+                    if base is None:
+                        continue  # 이미 끊어진 체인은 그대로 둠
+                    values[channel] = base[0] + delta["items"]
+                    changed = True
+            if changed:
+                with self.saver.lock:
+                    self.conn.execute(
+                        "UPDATE checkpoints SET type = ?, checkpoint = ? WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                        (*self.saver.serde.dumps_typed(checkpoint), thread_id, checkpoint_ns, checkpoint_id),
+                    )
+                    self.conn.commit()
+                rebased += 1
+        return rebased
+
+    def _cut_for(self, thread_id: str, checkpoint_ns: str, latest: str, now: float) -> Optional[str]:
+        """이 id보다 작은 체크포인트를 삭제 (최신 체크포인트는 항상 유지)"""
+        cuts = []
+        if self.policy.keep_last is not None:
+            row = self.conn.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+                (thread_id, checkpoint_ns, self.policy.keep_last - 1),
+            ).fetchone()
+            if row:
+                cuts.append(row[0])
+        if self.policy.max_age is not None:
+            cuts.append(checkpoint_id_at(now - self.policy.max_age))
+        if not cuts:
+            return None
+        return min(max(cuts), latest)
+
+    def run_once(self, vacuum: bool = False, vacuum_pages: int = 1000) -> dict:
+        report = {"threads_expired": 0, "checkpoints_deleted": 0, "writes_deleted": 0, "deltas_rebased": 0}
+        size_before = self.db_size()
+        now = time.time()
+
+        # (thread_id, ns)별 최신 체크포인트 (PK 인덱스로 그룹별 max 계산)
+        heads = self.conn.execute(
+            "SELECT thread_id, checkpoint_ns, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id, checkpoint_ns"
+        ).fetchall()
+
+        # 1. 오래 사용되지 않은 thread 통째로 삭제
+        expired = set()
+        if self.policy.idle_ttl is not None:
+            idle_cut = checkpoint_id_at(now - self.policy.idle_ttl)
+            latest_by_thread = {}
+            for thread_id, _, latest in heads:
+                latest_by_thread[thread_id] = max(latest_by_thread.get(thread_id, ""), latest)
+            for thread_id, latest in latest_by_thread.items():
+                if latest < idle_cut:
+                    report["checkpoints_deleted"] += self._delete_batched("checkpoints", "thread_id = ?", (thread_id,))
+                    report["writes_deleted"] += self._delete_batched("writes", "thread_id = ?", (thread_id,))
+                    expired.add(thread_id)
+            report["threads_expired"] = len(expired)
+
+        # 2. 남은 thread의 히스토리 정리 (keep_last / max_age)
+        for thread_id, checkpoint_ns, latest in heads:
+            if thread_id in expired:
+                continue
+            cut = self._cut_for(thread_id, checkpoint_ns, latest, now)
+            if cut is None:
+                continue
+            has_old = self.conn.execute(
+                "SELECT 1 FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ? LIMIT 1",
+                (thread_id, checkpoint_ns, cut),
+            ).fetchone()
+            if not has_old:
+                continue
+            report["deltas_rebased"] += self._rebase_deltas(thread_id, checkpoint_ns, cut)
+            where = "thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?"
+            report["checkpoints_deleted"] += self._delete_batched("checkpoints", where, (thread_id, checkpoint_ns, cut))
+            report["writes_deleted"] += self._delete_batched("writes", where, (thread_id, checkpoint_ns, cut))
+
+        if vacuum:
+            report["pages_freed"] = self.incremental_vacuum(vacuum_pages)
+        # WAL 내용을 본 파일로 옮김 (PASSIVE : 다른 연결을 기다리지 않음)
+        self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        report["db_bytes_before"] = size_before
+        report["db_bytes_after"] = self.db_size()
+        return report
+
+    def enable_incremental_vacuum(self) -> None:
+        """auto_vacuum=INCREMENTAL 전환 (최초 1회 전체 VACUUM 필요 => 트래픽이 없을 때 실행)"""
+        if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self.conn.execute("VACUUM")
+
+    def incremental_vacuum(self, pages: int = 1000, step: int = 100) -> int:
+        """빈 페이지를 step 단위로 반환 (auto_vacuum=INCREMENTAL 일 때만 동작)"""
+        if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            print("[Retention] auto_vacuum=INCREMENTAL 이 아니므로 vacuum 생략 (--enable-incremental 로 1회 전환)")
+            return 0
+        freed = 0
+        while freed < pages:
+            free_before = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free_before:
+                break
+            with self.saver.lock:
+                self.conn.execute(f"PRAGMA incremental_vacuum({min(step, pages - freed)})").fetchall()
+            freed += free_before - self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+            time.sleep(self.pause)
+        return freed
+
+    def db_size(self) -> int:
+        """본 DB 파일 크기 (WAL 파일은 checkpoint 후 재사용되므로 제외)"""
+        return os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+
+    def close(self) -> None:
+        self.saver.close()
+        self.conn.close()
+
+
+class RetentionJob:
+    """interval초마다 보존 정책을 적용하는 백그라운드 스레드"""
+
+    def __init__(self, db_path: str, policy: RetentionPolicy, interval: float = 600,
+                 vacuum: bool = True, **compactor_kwargs):
+        self.interval = interval
+        self.vacuum = vacuum
+        self.compactor = Compactor(db_path, policy, **compactor_kwargs)
+        self.last_report: Optional[dict] = None
+        self.last_error: Optional[BaseException] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="checkpoint-retention")
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.last_report = self.compactor.run_once(vacuum=self.vacuum)
+                self.last_error = None
+            except Exception as e:
+                # 락 경합뿐 아니라 역직렬화 실패 등 어떤 예외든 스레드를 죽이지 않고 다음 주기에 재시도
+                self.last_error = e
+                print(f"[Retention] 실패 (다음 주기에 재시도): {type(e).__name__}: {e}")
+                traceback.print_exc()
+            self._stop.wait(self.interval)
+
+    def start(self) -> "RetentionJob":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.compactor.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="체크포인트 DB 보존 정책 적용")
+    parser.add_argument("db_path")
+    parser.add_argument("--keep-last", type=int, help="thread별 유지할 최근 체크포인트 수")
+    parser.add_argument("--max-age-days", type=float, help="이보다 오래된 히스토리 삭제")
+    parser.add_argument("--idle-days", type=float, help="이 기간 동안 사용되지 않은 thread 삭제")
+    parser.add_argument("--vacuum", action="store_true", help="삭제 후 점진적 vacuum")
+    parser.add_argument("--enable-incremental", action="store_true", help="auto_vacuum=INCREMENTAL 전환 (전체 VACUUM 1회)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--every", type=float, help="지정하면 N초마다 반복 실행")
+    parser.add_argument("--dict-dir", help="CompressedSerializer로 저장된 DB면 압축 사전 폴더 지정")
+    args = parser.parse_args()
+
+    days = 86400
+    policy = RetentionPolicy(
+        keep_last=args.keep_last,
+        max_age=args.max_age_days * days if args.max_age_days is not None else None,
+        idle_ttl=args.idle_days * days if args.idle_days is not None else None,
+    )
+    serde = None
+    if args.dict_dir:
+        from checkpointer.compression import CompressedSerializer
+        serde = CompressedSerializer(dict_dir=args.dict_dir)
+    compactor = Compactor(args.db_path, policy, batch_size=args.batch_size, serde=serde)
+    try:
+        if args.enable_incremental:
+            compactor.enable_incremental_vacuum()
+        while True:
+            print(f"[Retention] {compactor.run_once(vacuum=args.vacuum)}")
+            if args.every is None:
+                break
+            time.sleep(args.every)
+    finally:
+        compactor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+'''
+thread_id 해시로 여러 SQLite 파일에 나눠 저장하는 체크포인터 (샤딩)
+ - db/checkpoints.db 하나에 모든 쓰기가 몰리면 파일 1개의 쓰기 락에서 처리량이 막힘
+ - ShardedSqliteSaver
+    1. thread_id를 일관된 해싱(consistent hashing, 가상 노드 사용)으로 샤드 파일 하나에 고정
+       => 샤드 수를 바꿔도 약 1/N 의 thread만 다른 샤드로 이동
+    2. 샤드마다 별도 연결/락(TunedSqliteSaver) => 샤드 수만큼 쓰기가 병렬로 진행
+    3. thread_id 없이 전체 조회(list(None))는 샤드별 결과를 checkpoint_id 순으로 병합
+ - 비동기 그래프(ainvoke)는 afrom_paths로 샤드마다 TunedAsyncSqliteSaver를 열어 사용
+ - 샤드 수를 바꾼 뒤에는 rebalance로 자리를 옮길 thread를 새 샤드로 복사 후 삭제
+   thread 하나를 옮기는 동안 원본 파일의 쓰기 락을 잡으므로 그 사이 원본에 들어온 쓰기도 함께 옮겨짐
+   단, 예전 샤드 구성으로 실행 중인 프로세스는 이동이 끝난 thread를 다시 원본에 쓸 수 있음
+   => 모든 프로세스를 새 샤드 구성으로 바꾼 뒤(또는 정지한 상태에서) 실행하고, status의 misplaced로 확인
+
+ # 사용
+    paths = [f"db/checkpoints-{i}.db" for i in range(4)]
+    with ShardedSqliteSaver.from_paths(paths) as checkpointer:
+        app = workflow.compile(checkpointer=checkpointer)
+
+    async with ShardedSqliteSaver.afrom_paths(paths) as checkpointer:
+        app = workflow.compile(checkpointer=checkpointer)
+        await app.ainvoke(inputs, config)
+
+ # 사용 (CLI)
+    python 01_기초개념설립/checkpointer/sharding.py status db/checkpoints-0.db db/checkpoints-1.db
+    python 01_기초개념설립/checkpointer/sharding.py rebalance db/checkpoints-{0,1,2,3}.db --source db/checkpoints.db
+'''
+import argparse
+import asyncio
+import bisect
+import hashlib
+import heapq
+import os
+import sys
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+if __name__ == "__main__":
+    # CLI로 직접 실행할 때도 checkpointer 패키지를 찾을 수 있도록
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkpointer.sqlite_tuned import TunedAsyncSqliteSaver, TunedSqliteSaver
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """가상 노드를 둔 일관된 해시 링 (샤드 이름 -> 링 위의 여러 지점)"""
+
+    def __init__(self, names: list, vnodes: int = 128):
+        if not names:
+            raise ValueError("샤드가 최소 1개 필요합니다")
+        self.names = list(names)
+        points = sorted((_hash(f"{name}#{i}"), name) for name in self.names for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [name for _, name in points]
+
+    def owner(self, thread_id: str) -> str:
+        index = bisect.bisect(self._hashes, _hash(str(thread_id))) % len(self._hashes)
+        return self._owners[index]
+
+
+def shard_name(path: str) -> str:
+    """링에는 파일 이름만 사용 (폴더를 옮겨도 배치가 바뀌지 않도록)"""
+    return os.path.basename(path)
+
+
+class ShardedSqliteSaver(BaseCheckpointSaver):
+    """thread_id별로 샤드 체크포인터를 골라 위임"""
+
+    def __init__(self, shards: dict, vnodes: int = 128):
+        first = next(iter(shards.values()))
+        super().__init__(serde=first.serde)
+        self.shards = shards  # 샤드 이름 -> 체크포인터
+        self.ring = HashRing(list(shards), vnodes=vnodes)
+
+    @staticmethod
+    def _shard_names(paths: list) -> list:
+        names = [shard_name(path) for path in paths]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            # 이름이 겹치면 dict에서 샤드 하나가 조용히 사라지므로 열기 전에 거부
+            raise ValueError(f"샤드 파일 이름이 중복됩니다 (링은 파일 이름만 사용): {duplicates}")
+        return names
+
+    @classmethod
+    @contextmanager
+    def from_paths(cls, paths: list, saver_cls=TunedSqliteSaver, vnodes: int = 128, **kwargs) -> Iterator["ShardedSqliteSaver"]:
+        names = cls._shard_names(paths)
+        with ExitStack() as stack:
+            shards = {name: stack.enter_context(saver_cls.from_conn_string(path, **kwargs)) for name, path in zip(names, paths)}
+            yield cls(shards, vnodes=vnodes)
+
+    @classmethod
+    @asynccontextmanager
+    async def afrom_paths(cls, paths: list, saver_cls=TunedAsyncSqliteSaver, vnodes: int = 128, **kwargs) -> AsyncIterator["ShardedSqliteSaver"]:
+        names = cls._shard_names(paths)
+        async with AsyncExitStack() as stack:
+            shards = {name: await stack.enter_async_context(saver_cls.from_conn_string(path, **kwargs)) for name, path in zip(names, paths)}
+            yield cls(shards, vnodes=vnodes)
+
+    def shard_for(self, config) -> BaseCheckpointSaver:
+        return self.shards[self.ring.owner(config["configurable"]["thread_id"])]
+
+    # 동기 API
+    def get_tuple(self, config):
+        return self.shard_for(config).get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        if config is not None and "thread_id" in config.get("configurable", {}):
+            yield from self.shard_for(config).list(config, filter=filter, before=before, limit=limit)
+            return
+        # 샤드별로 이미 checkpoint_id 내림차순 => 병합만 하면 전체 순서 유지
+        merged = heapq.merge(
+            *(shard.list(config, filter=filter, before=before, limit=limit) for shard in self.shards.values()),
+            key=lambda checkpoint_tuple: checkpoint_tuple.config["configurable"]["checkpoint_id"],
+            reverse=True,
+        )
+        for count, checkpoint_tuple in enumerate(merged):
+            if limit is not None and count >= limit:
+                return
+            yield checkpoint_tuple
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return self.shard_for(config).put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        self.shard_for(config).put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.shards[self.ring.owner(thread_id)].delete_thread(thread_id)
+
+    # 비동기 API (샤드 체크포인터의 비동기 메서드 사용)
+    async def aget_tuple(self, config):
+        return await self.shard_for(config).aget_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        if config is not None and "thread_id" in config.get("configurable", {}):
+            async for checkpoint_tuple in self.shard_for(config).alist(config, filter=filter, before=before, limit=limit):
+                yield checkpoint_tuple
+            return
+        # 비동기 이터레이터는 heapq.merge에 바로 넣을 수 없으므로 샤드별 결과(최대 limit개)를 동시에 모은 뒤 병합
+        async def collect(shard):
+            return [checkpoint_tuple async for checkpoint_tuple in shard.alist(config, filter=filter, before=before, limit=limit)]
+
+        results = await asyncio.gather(*(collect(shard) for shard in self.shards.values()))
+        merged = heapq.merge(
+            *results,
+            key=lambda checkpoint_tuple: checkpoint_tuple.config["configurable"]["checkpoint_id"],
+            reverse=True,
+        )
+        for count, checkpoint_tuple in enumerate(merged):
+            if limit is not None and count >= limit:
+                return
+            yield checkpoint_tuple
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await self.shard_for(config).aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await self.shard_for(config).aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.shards[self.ring.owner(thread_id)].adelete_thread(thread_id)
+
+    def get_next_version(self, current, channel):
+        return next(iter(self.shards.values())).get_next_version(current, channel)
+
+    def flush(self) -> None:
+        for shard in self.shards.values():
+            if hasattr(shard, "flush"):
+                shard.flush()
+
+    async def aflush(self) -> None:
+        for shard in self.shards.values():
+            if hasattr(shard, "aflush"):
+                await shard.aflush()
+
+
+# 마이그레이션 도구
+def _thread_ids(saver: TunedSqliteSaver) -> list:
+    with saver.cursor(transaction=False) as cur:
+        cur.execute("SELECT DISTINCT thread_id FROM checkpoints")
+        return [row[0] for row in cur.fetchall()]
+
+
+def _move_thread(source: TunedSqliteSaver, target: TunedSqliteSaver, thread_id: str, batch_size: int = 500) -> int:
+    """역직렬화 없이 행 그대로 복사 (checkpoints, writes) 후 원본에서 삭제
+    원본 파일의 쓰기 락(BEGIN IMMEDIATE)을 잡은 채 읽기~삭제를 진행 => 복사와 삭제 사이에 들어온 쓰기가 유실되지 않음"""
+    copied = 0
+    source.flush()
+    with source.lock:
+        source.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in ("checkpoints", "writes"):
+                cur = source.conn.execute(f"SELECT * FROM {table} WHERE thread_id = ?", (thread_id,))
+                columns = [column[0] for column in cur.description]
+                rows = cur.fetchall()
+                query = f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+                for start in range(0, len(rows), batch_size):
+                    with target.cursor() as target_cur:
+                        target_cur.executemany(query, rows[start:start + batch_size])
+                copied += len(rows) if table == "checkpoints" else 0
+            # 새 샤드에 commit된 뒤에만 원본 삭제 => 중간에 멈춰도 데이터가 사라지지 않음
+            target.flush()
+            source.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            source.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            source.conn.commit()
+        except BaseException:
+            source.conn.rollback()
+            raise
+    return copied
+
+
+def rebalance(sharded: ShardedSqliteSaver, sources: dict = None, dry_run: bool = False) -> dict:
+    """샤드(와 추가 원본 DB)의 모든 thread를 해시 링 기준 담당 샤드로 이동
+    예전 샤드 구성으로 실행 중인 프로세스가 없을 때 실행 (모듈 설명 참고)"""
+    sharded.flush()
+    report = {"threads_moved": 0, "checkpoints_moved": 0, "by_target": {}}
+    candidates = {**sharded.shards, **(sources or {})}
+    for name, source in candidates.items():
+        for thread_id in _thread_ids(source):
+            owner = sharded.ring.owner(thread_id)
+            if owner == name and name in sharded.shards:
+                continue
+            report["threads_moved"] += 1
+            report["by_target"][owner] = report["by_target"].get(owner, 0) + 1
+            if dry_run:
+                continue
+            report["checkpoints_moved"] += _move_thread(source, sharded.shards[owner], thread_id)
+    return report
+
+
+def status(sharded: ShardedSqliteSaver) -> dict:
+    """샤드별 thread/체크포인트 수와 담당이 아닌 샤드에 있는 thread 수"""
+    sharded.flush()
+    report = {}
+    for name, shard in sharded.shards.items():
+        threads = _thread_ids(shard)
+        with shard.cursor(transaction=False) as cur:
+            cur.execute("SELECT COUNT(*) FROM checkpoints")
+            checkpoints = cur.fetchone()[0]
+        report[name] = {
+            "threads": len(threads),
+            "checkpoints": checkpoints,
+            "misplaced": sum(1 for thread_id in threads if sharded.ring.owner(thread_id) != name),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="체크포인트 샤드 관리 (rebalance는 예전 샤드 구성으로 실행 중인 프로세스가 없을 때 실행)")
+    parser.add_argument("command", choices=["status", "rebalance"])
+    parser.add_argument("shards", nargs="+", help="새 샤드 구성 (DB 파일 경로 목록)")
+    parser.add_argument("--source", nargs="*", default=[], help="비울 원본 DB (기존 단일 DB, 제거할 샤드 등)")
+    parser.add_argument("--vnodes", type=int, default=128)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    with ShardedSqliteSaver.from_paths(args.shards, vnodes=args.vnodes) as sharded, ExitStack() as stack:
+        if args.command == "status":
+            for name, info in status(sharded).items():
+                print(f"[{name}] {info}")
+            return
+        sources = {f"source:{path}": stack.enter_context(TunedSqliteSaver.from_conn_string(path)) for path in args.source}
+        print(f"[Rebalance] {rebalance(sharded, sources, dry_run=args.dry_run)}")
+
+
+if __name__ == "__main__":
+    main()
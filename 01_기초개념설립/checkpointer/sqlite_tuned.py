@@ -0,0 +1,461 @@
+'''
+동시 접속에 맞춘 SQLite 체크포인터
+ - 기본 SqliteSaver : 연결 1개 + 락 1개, 체크포인트를 쓸 때마다 commit
+   => thread_id가 많아지면 모든 superstep이 파일 하나에서 줄을 섬
+ - TunedSqliteSaver
+    1. WAL + synchronous=NORMAL : 읽기와 쓰기가 서로 막지 않고, commit 시 fsync 부담 감소
+       (commit된 쓰기는 프로세스가 죽어도 남지만, OS 크래시/정전 시 마지막 commit 일부는 유실될 수 있음)
+    2. 그룹 커밋 (리더 방식) : 쓰기 락을 기다리는 다른 쓰기가 없으면 바로 commit (경쟁이 없을 때는 기본과 같은 지연)
+       기다리는 쓰기가 있으면 commit을 미루고, 줄의 마지막 쓰기가 앞선 쓰기까지 한 번에 commit
+       put은 자신의 쓰기가 포함된 묶음이 commit될 때까지 기다린 뒤 반환
+       (max_batch개가 쌓이면 즉시 commit, 혹시 남은 묶음은 commit_interval 뒤 백그라운드에서 commit)
+       durable=False면 기다리지 않고 바로 반환하고 commit은 백그라운드에 맡김
+       => 더 빠르지만 크래시 시 최근 commit_interval 동안의 쓰기 유실 가능
+    3. 읽기 전용 연결 풀 : get_state / get_state_history 조회가 쓰기 락을 기다리지 않음
+ - TunedAsyncSqliteSaver : 비동기 그래프(ainvoke)용, 위 1~3을 aiosqlite 위에서 같은 방식으로 적용
+   (tuned_async_saver()는 from_conn_string의 짧은 이름)
+
+ # 사용
+    with TunedSqliteSaver.from_conn_string("db/checkpoints.db") as checkpointer:
+        app = workflow.compile(checkpointer=checkpointer)
+
+    async with TunedAsyncSqliteSaver.from_conn_string("db/checkpoints.db") as checkpointer:
+        app = workflow.compile(checkpointer=checkpointer)
+        await app.ainvoke(inputs, config)
+'''
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA busy_timeout=5000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-20000;
+"""
+
+
+class _Batch:
+    """한 번의 commit으로 묶이는 쓰기 묶음 (commit이 끝나면 event 설정)"""
+    __slots__ = ("event", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class TunedSqliteSaver(SqliteSaver):
+    """WAL + 그룹 커밋 + 읽기 연결 풀을 사용하는 SqliteSaver"""
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        *,
+        db_path: Optional[str] = None,
+        commit_interval: float = 0.005,
+        max_batch: int = 64,
+        readers: int = 4,
+        durable: bool = True,
+        serde=None,
+    ):
+        super().__init__(conn, serde=serde)
+        self.db_path = db_path
+        self.commit_interval = commit_interval  # 0이면 기존처럼 쓰기마다 commit
+        self.max_batch = max_batch              # 이 개수만큼 쌓이면 즉시 commit
+        self.durable = durable                  # True면 쓰기가 commit될 때까지 기다린 뒤 반환
+
+        self._pending = 0
+        self._batch = _Batch()
+        self._waiting = 0  # 쓰기 락을 기다리는 쓰기 수 (0이면 지금 쓰기가 줄의 마지막)
+        self._waiting_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._closed = False
+        self._flusher = None
+        if commit_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True, name="checkpoint-flusher")
+            self._flusher.start()
+
+        # 파일 DB일 때만 읽기 전용 연결 풀 생성 (:memory: 는 연결마다 별도 DB라 불가)
+        self._readers: Optional[queue.Queue] = None
+        if db_path and db_path != ":memory:" and readers > 0:
+            self._readers = queue.Queue()
+            self._reader_count = readers
+
+    @classmethod
+    @contextmanager
+    def from_conn_string(cls, conn_string: str, **kwargs) -> Iterator["TunedSqliteSaver"]:
+        conn = sqlite3.connect(conn_string, check_same_thread=False)
+        saver = cls(conn, db_path=conn_string, **kwargs)
+        try:
+            yield saver
+        finally:
+            saver.close()
+            conn.close()
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        self.conn.executescript(PRAGMAS)
+        super().setup()
+        # 스키마가 생긴 뒤 읽기 연결을 엶
+        if self._readers is not None:
+            for _ in range(self._reader_count):
+                reader = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+                reader.executescript("PRAGMA busy_timeout=5000; PRAGMA cache_size=-20000;")
+                self._readers.put(reader)
+
+    # 그룹 커밋
+    def _commit_locked(self) -> None:
+        if not self._pending:
+            return
+        batch, self._batch = self._batch, _Batch()
+        self._pending = 0
+        try:
+            self.conn.commit()
+        except BaseException as e:
+            # 실패는 묶음에 포함된 쓰기를 기다리는 쪽에서 다시 발생시킴
+            batch.error = e
+        finally:
+            batch.event.set()
+
+    def _wait_commit(self, batch: _Batch) -> None:
+        batch.event.wait()
+        if batch.error is not None:
+            raise sqlite3.OperationalError(f"체크포인트 commit 실패: {batch.error}") from batch.error
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._flush_event.wait()
+            self._flush_event.clear()
+            if self._closed:
+                break
+            # 리더가 commit하지 못하고 남은 묶음(durable=False 등)을 commit_interval 뒤 commit
+            time.sleep(self.commit_interval)
+            with self.lock:
+                self._commit_locked()
+
+    def flush(self) -> None:
+        """대기 중인 쓰기를 즉시 commit"""
+        with self.lock:
+            batch = self._batch if self._pending else None
+            self._commit_locked()
+        if batch is not None:
+            self._wait_commit(batch)
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        if not transaction and self._readers is not None:
+            with self._reader_cursor() as cur:
+                yield cur
+            return
+
+        batch = None
+        if transaction:
+            with self._waiting_lock:
+                self._waiting += 1
+        with self.lock:
+            if transaction:
+                with self._waiting_lock:
+                    self._waiting -= 1
+            self.setup()
+            cur = self.conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+                if transaction:
+                    self._pending += 1
+                    batch = self._batch
+                    with self._waiting_lock:
+                        last_in_line = self._waiting == 0
+                    if self._flusher is None or self._pending >= self.max_batch or (self.durable and last_in_line):
+                        self._commit_locked()
+                    else:
+                        self._flush_event.set()
+        # 락을 놓은 뒤 기다림 => 줄에 선 다음 쓰기들이 같은 묶음에 합류한 뒤 마지막 쓰기가 commit
+        if batch is not None and self.durable:
+            self._wait_commit(batch)
+
+    @contextmanager
+    def _reader_cursor(self) -> Iterator[sqlite3.Cursor]:
+        with self.lock:
+            self.setup()
+            # 다른 연결은 commit 전의 쓰기를 볼 수 없으므로 조회 전에 먼저 commit (read-your-writes)
+            self._commit_locked()
+        reader = self._readers.get()
+        cur = reader.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+            self._readers.put(reader)
+
+    def close(self) -> None:
+        """flusher 종료 + 남은 쓰기 commit + 읽기 연결 정리"""
+        self._closed = True
+        self._flush_event.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=1)
+        self.flush()
+        if self._readers is not None:
+            while not self._readers.empty():
+                self._readers.get_nowait().close()
+
+
+class _AsyncBatch:
+    """_Batch의 asyncio 버전"""
+    __slots__ = ("event", "error")
+
+    def __init__(self):
+        self.event = asyncio.Event()
+        self.error: Optional[BaseException] = None
+
+
+class TunedAsyncSqliteSaver(AsyncSqliteSaver):
+    """TunedSqliteSaver의 비동기 버전 (app.ainvoke / app.aget_state 용)
+    쓰기 : 같은 리더 방식 그룹 커밋 (기다리는 쓰기가 없으면 바로 commit)
+    읽기 : 읽기 전용 aiosqlite 연결 풀 (연결마다 AsyncSqliteSaver를 하나씩 두고 조회를 위임)"""
+
+    def __init__(
+        self,
+        conn: aiosqlite.Connection,
+        *,
+        db_path: Optional[str] = None,
+        commit_interval: float = 0.005,
+        max_batch: int = 64,
+        readers: int = 4,
+        durable: bool = True,
+        serde=None,
+    ):
+        super().__init__(conn, serde=serde)
+        self.db_path = db_path
+        self.commit_interval = commit_interval  # 0이면 기존처럼 쓰기마다 commit
+        self.max_batch = max_batch
+        self.durable = durable
+
+        self._pending = 0
+        self._batch = _AsyncBatch()
+        self._waiting = 0  # self.lock을 기다리는 쓰기 수 (이벤트 루프 하나에서만 바뀌므로 별도 락 불필요)
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self._reader_count = readers if db_path and db_path != ":memory:" else 0
+        self._readers: Optional[asyncio.Queue] = None
+        self._reader_conns: list = []
+
+    @classmethod
+    @asynccontextmanager
+    async def from_conn_string(cls, conn_string: str, **kwargs) -> AsyncIterator["TunedAsyncSqliteSaver"]:
+        async with aiosqlite.connect(conn_string) as conn:
+            saver = cls(conn, db_path=conn_string, **kwargs)
+            try:
+                yield saver
+            finally:
+                await saver.aclose()
+
+    async def setup(self) -> None:
+        if self.is_setup:
+            return
+        await self.conn.executescript(PRAGMAS)
+        await super().setup()
+        # 스키마가 생긴 뒤 읽기 연결을 엶 (동시에 setup이 불려도 한 번만 만들도록 Queue를 먼저 둠)
+        if self._reader_count and self._readers is None:
+            self._readers = asyncio.Queue()
+            for _ in range(self._reader_count):
+                conn = await aiosqlite.connect(f"file:{self.db_path}?mode=ro", uri=True)
+                await conn.executescript("PRAGMA busy_timeout=5000; PRAGMA cache_size=-20000;")
+                self._reader_conns.append(conn)
+                reader = AsyncSqliteSaver(conn, serde=self.serde)
+                reader.is_setup = True  # 읽기 전용 연결이므로 CREATE TABLE을 건너뜀
+                self._readers.put_nowait(reader)
+
+    # 그룹 커밋
+    async def _commit_locked(self) -> None:
+        if not self._pending:
+            return
+        batch, self._batch = self._batch, _AsyncBatch()
+        self._pending = 0
+        try:
+            await self.conn.commit()
+        except BaseException as e:
+            batch.error = e
+        finally:
+            batch.event.set()
+
+    async def _wait_commit(self, batch: _AsyncBatch) -> None:
+        await batch.event.wait()
+        if batch.error is not None:
+            raise sqlite3.OperationalError(f"체크포인트 commit 실패: {batch.error}") from batch.error
+
+    async def _flush_later(self) -> None:
+        # 리더가 commit하지 못하고 남은 묶음(durable=False 등)을 commit_interval 뒤 commit
+        await asyncio.sleep(self.commit_interval)
+        self._flush_task = None
+        async with self.lock:
+            await self._commit_locked()
+
+    async def aflush(self) -> None:
+        """대기 중인 쓰기를 즉시 commit"""
+        async with self.lock:
+            batch = self._batch if self._pending else None
+            await self._commit_locked()
+        if batch is not None:
+            await self._wait_commit(batch)
+
+    @asynccontextmanager
+    async def _write_cursor(self) -> AsyncIterator[aiosqlite.Cursor]:
+        await self.setup()
+        self._waiting += 1
+        try:
+            await self.lock.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            async with self.conn.cursor() as cur:
+                yield cur
+        finally:
+            self._pending += 1
+            batch = self._batch
+            if self.commit_interval <= 0 or self._pending >= self.max_batch or (self.durable and self._waiting == 0):
+                await self._commit_locked()
+            elif self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_later())
+            self.lock.release()
+        # 락을 놓은 뒤 기다림 => 줄에 선 다음 쓰기들이 같은 묶음에 합류
+        if self.durable:
+            await self._wait_commit(batch)
+
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[Optional[AsyncSqliteSaver]]:
+        await self.setup()
+        if self._readers is None:
+            yield None
+            return
+        async with self.lock:
+            # 다른 연결은 commit 전의 쓰기를 볼 수 없으므로 조회 전에 먼저 commit (read-your-writes)
+            await self._commit_locked()
+        reader = await self._readers.get()
+        try:
+            yield reader
+        finally:
+            self._readers.put_nowait(reader)
+
+    # 쓰기 : 기본 구현과 같은 SQL, commit만 그룹 커밋으로
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        serialized_metadata = self.jsonplus_serde.dumps(get_checkpoint_metadata(config, metadata))
+        async with self._write_cursor() as cur:
+            await cur.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(thread_id),
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    serialized_checkpoint,
+                    serialized_metadata,
+                ),
+            )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        query = (
+            "INSERT OR REPLACE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            if all(w[0] in WRITES_IDX_MAP for w in writes)
+            else "INSERT OR IGNORE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+        )
+        rows = [
+            (
+                str(config["configurable"]["thread_id"]),
+                str(config["configurable"]["checkpoint_ns"]),
+                str(config["configurable"]["checkpoint_id"]),
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                *self.serde.dumps_typed(value),
+            )
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        async with self._write_cursor() as cur:
+            await cur.executemany(query, rows)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        async with self._write_cursor() as cur:
+            await cur.execute("DELETE FROM checkpoints WHERE thread_id = ?", (str(thread_id),))
+            await cur.execute("DELETE FROM writes WHERE thread_id = ?", (str(thread_id),))
+
+    # 읽기 : 읽기 연결 풀이 있으면 그쪽 AsyncSqliteSaver에 위임
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        async with self._reader() as reader:
+            if reader is None:
+                return await super().aget_tuple(config)
+            return await reader.aget_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        async with self._reader() as reader:
+            source = reader if reader is not None else super()
+            async for item in source.alist(config, filter=filter, before=before, limit=limit):
+                yield item
+
+    async def aclose(self) -> None:
+        """남은 쓰기 commit + 읽기 연결 정리"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.aflush()
+        for conn in self._reader_conns:
+            await conn.close()
+        self._reader_conns.clear()
+        self._readers = None
+
+
+@asynccontextmanager
+async def tuned_async_saver(conn_string: str, **kwargs) -> AsyncIterator[TunedAsyncSqliteSaver]:
+    """TunedAsyncSqliteSaver.from_conn_string의 짧은 이름"""
+    async with TunedAsyncSqliteSaver.from_conn_string(conn_string, **kwargs) as saver:
+        yield saver
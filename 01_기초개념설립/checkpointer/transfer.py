@@ -0,0 +1,274 @@
+'''
+체크포인트 히스토리 스트리밍 내보내기/가져오기 (JSONL)
+ - app.get_state(config)로는 thread 하나씩만 볼 수 있음 (10_3 참고)
+ - export_checkpoints : 체크포인터 => 한 줄에 체크포인트 1개 (pending writes 포함)
+    thread마다 오래된 체크포인트부터 기록 => 가져올 때 부모가 항상 자식보다 먼저 저장됨
+    (DeltaSqliteSaver는 부모 기준 델타로, CachedCheckpointSaver는 가장 최신 체크포인트를 캐시)
+ - import_checkpoints : JSONL => 다른 체크포인터 (MemorySaver, SQLite, 샤드 등 어디든)
+ - 레코드를 하나씩 읽고 쓰므로 체크포인트가 수백만 개여도 메모리 사용량이 일정
+ - thread_id 접두어, 생성 시각 범위(since ~ until)로 필터링
+ - 파일에는 저장소별 serde(압축 등)와 무관한 기본 직렬화(JsonPlusSerializer) + base64로 기록
+   경로가 .gz로 끝나면 gzip 압축
+ - CLI는 DB 쪽을 저장 방식에 맞는 체크포인터로 열어야 함 (export는 원본, import는 대상)
+    --delta    : DeltaSqliteSaver (델타를 전체 리스트로 복원해서 내보내고, 가져올 때 다시 델타로 저장)
+    --dict-dir : CompressedSerializer (압축된 행이 있는데 지정하지 않으면 바로 실패)
+   델타({"__delta__": ...})가 복원되지 않은 채 남은 값은 파일에 쓰거나 저장하지 않고 실패
+
+ # 사용 (CLI)
+    python 01_기초개념설립/checkpointer/transfer.py export db/checkpoints.db dump.jsonl.gz --prefix user_ --since 2025-01-01
+    python 01_기초개념설립/checkpointer/transfer.py import dump.jsonl.gz db/checkpoints-new.db
+    python 01_기초개념설립/checkpointer/transfer.py export db/checkpoints.db dump.jsonl.gz --delta --dict-dir db/serde_dicts
+'''
+import argparse
+import base64
+import gzip
+import json
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from typing import IO, Iterable, Iterator, Optional
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+if __name__ == "__main__":
+    # CLI로 직접 실행할 때도 checkpointer 패키지를 찾을 수 있도록
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkpointer.bounded_memory import BoundedMemorySaver
+from checkpointer.cache import CachedCheckpointSaver
+from checkpointer.compression import TYPE_SUFFIX, CompressedSerializer
+from checkpointer.delta import DELTA_KEY, DeltaSqliteSaver, _is_delta
+from checkpointer.retention import checkpoint_id_at
+from checkpointer.sharding import ShardedSqliteSaver
+from checkpointer.sqlite_tuned import TunedSqliteSaver
+
+FORMAT_VERSION = 1
+_FILE_SERDE = JsonPlusSerializer()
+
+
+def _encode(value) -> list:
+    type_, data = _FILE_SERDE.dumps_typed(value)
+    return [type_, base64.b64encode(data).decode("ascii")]
+
+
+def _decode(value: list):
+    return _FILE_SERDE.loads_typed((value[0], base64.b64decode(value[1])))
+
+
+def _check_resolved(checkpoint: dict, thread_id: str, checkpoint_id: str) -> None:
+    """복원되지 않은 델타가 남아 있으면 실패 (부모 없이는 의미가 없는 값)"""
+    channels = sorted(channel for channel, value in checkpoint.get("channel_values", {}).items() if _is_delta(value))
+    if channels:
+        raise ValueError(
+            f"thread={thread_id} checkpoint={checkpoint_id} 채널 {channels} 값이 델타({DELTA_KEY})로 남아 있습니다 "
+            "(DeltaSqliteSaver로 저장된 DB는 --delta로 열어야 함)"
+        )
+
+
+# thread 목록 (저장소 종류별로 전체를 메모리에 올리지 않고 순회)
+def _sqlite_thread_ids(saver, prefix: str, page: int = 1000) -> Iterator[str]:
+    last = prefix
+    first = True
+    while True:
+        with saver.cursor(transaction=False) as cur:
+            cur.execute(
+                f"SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id {'>=' if first else '>'} ? ORDER BY thread_id LIMIT ?",
+                (last, page),
+            )
+            rows = [row[0] for row in cur.fetchall()]
+        for thread_id in rows:
+            if not thread_id.startswith(prefix):
+                return  # 정렬되어 있으므로 접두어 범위를 벗어나면 끝
+            yield thread_id
+        if len(rows) < page:
+            return
+        last, first = rows[-1], False
+
+
+def thread_ids(saver, prefix: str = "") -> Iterator[str]:
+    if isinstance(saver, CachedCheckpointSaver):
+        yield from thread_ids(saver.saver, prefix)
+    elif isinstance(saver, ShardedSqliteSaver):
+        for shard in saver.shards.values():
+            yield from thread_ids(shard, prefix)
+    elif isinstance(saver, BoundedMemorySaver):
+        with saver._lock:
+            ids = [*saver._resident, *saver._spilled]
+        yield from (thread_id for thread_id in ids if str(thread_id).startswith(prefix))
+    elif isinstance(saver, InMemorySaver):
+        yield from (thread_id for thread_id in list(saver.storage) if str(thread_id).startswith(prefix))
+    elif hasattr(saver, "conn"):
+        yield from _sqlite_thread_ids(saver, prefix)
+    else:
+        # 그 외 체크포인터 : 전체 목록에서 thread_id만 골라냄 (중복 제거용 집합만 메모리 사용)
+        seen = set()
+        for checkpoint_tuple in saver.list(None):
+            thread_id = checkpoint_tuple.config["configurable"]["thread_id"]
+            if thread_id not in seen and str(thread_id).startswith(prefix):
+                seen.add(thread_id)
+                yield thread_id
+
+
+def _oldest_first(saver, config, before, since_id: Optional[str], page_size: int) -> Iterator:
+    """list(최신 → 과거)를 page_size개씩 뒤집어 과거 → 최신 순으로 반환
+    1차 : 훑으면서 가장 최신 페이지만 보관하고 나머지는 페이지 경계 id만 기억
+    2차 : 가장 오래된 페이지부터 경계 id로 다시 읽어 뒤집음 (과거 체크포인트는 바뀌지 않으므로 경계가 고정)"""
+    newest, bounds = [], []
+    count = 0
+    for checkpoint_tuple in saver.list(config, before=before):
+        checkpoint_id = checkpoint_tuple.config["configurable"]["checkpoint_id"]
+        if since_id is not None and checkpoint_id < since_id:
+            break  # checkpoint_id(=생성 시각) 내림차순 => since 이전이 나오면 끝
+        count += 1
+        if count <= page_size:
+            newest.append(checkpoint_tuple)
+        if count % page_size == 0:
+            bounds.append({"configurable": {"checkpoint_id": checkpoint_id}})
+
+    for bound in reversed(bounds):
+        page = list(saver.list(config, before=bound, limit=page_size))
+        for checkpoint_tuple in reversed(page):
+            if since_id is None or checkpoint_tuple.config["configurable"]["checkpoint_id"] >= since_id:
+                yield checkpoint_tuple
+    yield from reversed(newest)
+
+
+def export_checkpoints(saver, out: IO[str], prefix: str = "", since: Optional[float] = None,
+                       until: Optional[float] = None, page_size: int = 500) -> int:
+    """조건에 맞는 체크포인트를 thread별 오래된 순으로 한 줄씩 기록하고 개수 반환"""
+    since_id = checkpoint_id_at(since) if since is not None else None
+    before = {"configurable": {"checkpoint_id": checkpoint_id_at(until)}} if until is not None else None
+    count = 0
+    for thread_id in thread_ids(saver, prefix):
+        for checkpoint_tuple in _oldest_first(saver, {"configurable": {"thread_id": thread_id}}, before, since_id, page_size):
+            configurable = checkpoint_tuple.config["configurable"]
+            parent = checkpoint_tuple.parent_config["configurable"]["checkpoint_id"] if checkpoint_tuple.parent_config else None
+            _check_resolved(checkpoint_tuple.checkpoint, thread_id, configurable["checkpoint_id"])
+            record = {
+                "v": FORMAT_VERSION,
+                "thread_id": thread_id,
+                "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+                "checkpoint_id": configurable["checkpoint_id"],
+                "parent_checkpoint_id": parent,
+                "checkpoint": _encode(checkpoint_tuple.checkpoint),
+                "metadata": _encode(checkpoint_tuple.metadata),
+                "writes": [[task_id, channel, _encode(value)] for task_id, channel, value in checkpoint_tuple.pending_writes or []],
+            }
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def read_records(lines: Iterable[str], prefix: str = "", since: Optional[float] = None,
+                 until: Optional[float] = None) -> Iterator[dict]:
+    since_id = checkpoint_id_at(since) if since is not None else None
+    until_id = checkpoint_id_at(until) if until is not None else None
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if record.get("v", 1) > FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 내보내기 포맷 버전: {record['v']}")
+        if not str(record["thread_id"]).startswith(prefix):
+            continue
+        if since_id is not None and record["checkpoint_id"] < since_id:
+            continue
+        if until_id is not None and record["checkpoint_id"] >= until_id:
+            continue
+        yield record
+
+
+def import_checkpoints(saver, lines: Iterable[str], prefix: str = "", since: Optional[float] = None,
+                       until: Optional[float] = None) -> int:
+    """JSONL 레코드를 파일 순서(thread별 오래된 순)대로 체크포인터에 저장하고 개수 반환"""
+    count = 0
+    for record in read_records(lines, prefix, since, until):
+        checkpoint = _decode(record["checkpoint"])
+        _check_resolved(checkpoint, record["thread_id"], record["checkpoint_id"])
+        config = {"configurable": {
+            "thread_id": record["thread_id"],
+            "checkpoint_ns": record["checkpoint_ns"],
+        }}
+        if record["parent_checkpoint_id"]:
+            config["configurable"]["checkpoint_id"] = record["parent_checkpoint_id"]
+        # 모든 채널 버전을 새 버전으로 넘김 (MemorySaver는 new_versions에 있는 채널 값만 저장)
+        next_config = saver.put(config, checkpoint, _decode(record["metadata"]), dict(checkpoint.get("channel_versions", {})))
+
+        by_task = {}
+        for task_id, channel, value in record["writes"]:
+            by_task.setdefault(task_id, []).append((channel, _decode(value)))
+        for task_id, writes in by_task.items():
+            saver.put_writes(next_config, writes, task_id)
+        count += 1
+    if hasattr(saver, "flush"):
+        saver.flush()
+    return count
+
+
+@contextmanager
+def open_text(path: str, mode: str):
+    """'-'는 표준 입출력, .gz는 gzip"""
+    if path == "-":
+        yield sys.stdout if mode == "w" else sys.stdin
+    elif path.endswith(".gz"):
+        with gzip.open(path, mode + "t", encoding="utf-8") as f:
+            yield f
+    else:
+        with open(path, mode, encoding="utf-8") as f:
+            yield f
+
+
+@contextmanager
+def open_saver(path: str, delta: bool = False, delta_channels: tuple = ("messages",),
+               dict_dir: Optional[str] = None) -> Iterator[TunedSqliteSaver]:
+    """DB를 저장 방식(델타/압축)에 맞는 체크포인터로 엶"""
+    serde = CompressedSerializer(dict_dir=dict_dir) if dict_dir else None
+    if delta:
+        opened = DeltaSqliteSaver.from_conn_string(path, append_channels=tuple(delta_channels), serde=serde)
+    else:
+        opened = TunedSqliteSaver.from_conn_string(path, serde=serde)
+    with opened as saver:
+        saver.setup()
+        if serde is None:
+            with saver.cursor(transaction=False) as cur:
+                cur.execute("SELECT 1 FROM checkpoints WHERE type LIKE ? LIMIT 1", (f"%{TYPE_SUFFIX}",))
+                compressed = cur.fetchone() is not None
+            if compressed:
+                raise ValueError(f"{path} 에 CompressedSerializer로 압축된 행이 있습니다 (--dict-dir 로 압축 사전 폴더 지정)")
+        yield saver
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    """'2025-01-01' 또는 '2025-01-01T09:00:00' 형식 (로컬 시간)"""
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="체크포인트 히스토리 내보내기/가져오기")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("source", help="export : DB 경로 / import : JSONL 경로 ('-' = 표준 입력)")
+    parser.add_argument("target", help="export : JSONL 경로 ('-' = 표준 출력) / import : DB 경로")
+    parser.add_argument("--prefix", default="", help="thread_id 접두어")
+    parser.add_argument("--since", help="이 시각 이후 생성된 체크포인트만")
+    parser.add_argument("--until", help="이 시각 이전 생성된 체크포인트만")
+    parser.add_argument("--delta", action="store_true", help="DB가 DeltaSqliteSaver 형식 (export : 원본 / import : 대상)")
+    parser.add_argument("--delta-channels", nargs="+", default=["messages"], help="--delta 일 때 델타로 저장되는 채널")
+    parser.add_argument("--dict-dir", help="DB가 CompressedSerializer 형식이면 압축 사전 폴더")
+    args = parser.parse_args()
+
+    since, until = _timestamp(args.since), _timestamp(args.until)
+    db_path = args.source if args.command == "export" else args.target
+    with open_saver(db_path, args.delta, args.delta_channels, args.dict_dir) as saver:
+        if args.command == "export":
+            with open_text(args.target, "w") as out:
+                count = export_checkpoints(saver, out, args.prefix, since, until)
+        else:
+            with open_text(args.source, "r") as lines:
+                count = import_checkpoints(saver, lines, args.prefix, since, until)
+    print(f"[Transfer] {args.command} : 체크포인트 {count}개", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,23 @@
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Literal
+from functools import partial
+import asyncio
 # agent 모듈 => agent 폴더 속에 구분
-from agent.classification import classify_agent
+from agent.classification import cascade_classify_agent, acascade_classify_agent, cascade
 from agent.agents import tech_support_agent, billing_agent, general_agent
+from agent.agents import atech_support_agent, abilling_agent, ageneral_agent
+from agent.agents import best_of_n, abest_of_n
+from agent.llm_cache import enable_cache, cache_stats
+
+# 반복 문의가 많은 분류/신뢰도 평가 노드만 응답 캐시 사용
+enable_cache("classify", "evaluate")
+
+# 답변과 신뢰도를 한 번의 LLM 호출로 생성 (JSON 파싱 실패 시 평가 LLM으로 대체)
+CONFIDENCE_MODE = "single"
+
+# 1보다 크면 후보 답변 N개를 동시에 생성/평가하여 최고 신뢰도 답변 선택 (순차 retry 대신)
+#  - 문의마다 생성 비용이 N배가 되므로 기본값은 1 (지연/비용보다 품질이 중요할 때만 올려서 사용)
+BEST_OF_N = 1
 
 # 상태 정의
 class CustomerState(TypedDict):
@@ -11,6 +26,7 @@ class CustomerState(TypedDict):
     response: str
     confidence: float
     retry_count: int # retry 횟수
+    classified_by: str # 분류 결정 단계 (rule / vector / llm)
 
 # confidence 값에 따라 재시도 하는 노드
 def retry_node(state: CustomerState) -> CustomerState:
@@ -61,58 +77,115 @@ def check_confidence(state: CustomerState) -> Literal["retry", "escalate", "done
     else:
         return "escalate"
 
+# 조건부 라우팅: best-of-N 신뢰도 체크 (후보 중 최고점도 기준 미달이면 바로 상담원 연결)
+def check_best_confidence(state: CustomerState) -> Literal["escalate", "done"]:
+    if state["confidence"] >= 0.7:
+        return "done"
+    return "escalate"
+
 # 그래프 생성
-workflow = StateGraph(CustomerState)
-
-# 노드 추가
-workflow.add_node("classifier", classify_agent)
-workflow.add_node("tech_support", tech_support_agent)
-workflow.add_node("billing", billing_agent)
-workflow.add_node("general", general_agent)
-workflow.add_node("retry", retry_node)
-workflow.add_node("escalate", escalate_to_human)
-
-# 엣지 설정
-workflow.set_entry_point("classifier")
-
-# 조건부 엣지
-workflow.add_conditional_edges(
-    "classifier",           # 시작 노드
-    route_query,            # 라우팅 함수
-    {
-        "tech_support": "tech_support",
-        "billing": "billing",
-        "general": "general"
-    }
-)
+def build_workflow(async_mode: bool = False, n_candidates: int = BEST_OF_N,
+                   confidence_mode: str = CONFIDENCE_MODE) -> StateGraph:
+    """async_mode=True면 비동기 노드로 구성 => app.ainvoke로 실행
+    n_candidates > 1 이면 retry 루프 대신 best-of-N 병렬 샘플링
+    confidence_mode : 에이전트 노드의 신뢰도 산정 방식 ("separate" / "single")"""
+    workflow = StateGraph(CustomerState)
+
+    # 노드 추가
+    if async_mode:
+        classifier = acascade_classify_agent
+        agent_nodes = {"tech_support": atech_support_agent, "billing": abilling_agent, "general": ageneral_agent}
+        wrap = abest_of_n
+    else:
+        classifier = cascade_classify_agent
+        agent_nodes = {"tech_support": tech_support_agent, "billing": billing_agent, "general": general_agent}
+        wrap = best_of_n
+
+    agent_nodes = {name: partial(agent_fn, confidence_mode=confidence_mode) for name, agent_fn in agent_nodes.items()}
+
+    workflow.add_node("classifier", classifier)
+    for name, agent_fn in agent_nodes.items():
+        workflow.add_node(name, wrap(agent_fn, n_candidates) if n_candidates > 1 else agent_fn)
+    workflow.add_node("escalate", escalate_to_human)
 
-# 각 에이전트 후 신뢰도 체크
-for agent in ["tech_support", "billing", "general"]:
+    # 엣지 설정
+    workflow.set_entry_point("classifier")
+
+    # 조건부 엣지
     workflow.add_conditional_edges(
-        agent,
-        check_confidence,
+        "classifier",           # 시작 노드
+        route_query,            # 라우팅 함수
         {
-            "done": END,
-            "retry": "retry",
-            "escalate": "escalate"
+            "tech_support": "tech_support",
+            "billing": "billing",
+            "general": "general"
         }
     )
 
-# 재시도는 분류기로 다시 (카테고리는 유지)
-workflow.add_conditional_edges(
-    "retry",
-    route_query,
-    {
-        "tech_support": "tech_support",
-        "billing": "billing",
-        "general": "general"
+    if n_candidates > 1:
+        # 각 에이전트 후 신뢰도 체크 (후보를 이미 병렬로 뽑았으므로 retry 없음)
+        for agent in agent_nodes:
+            workflow.add_conditional_edges(
+                agent,
+                check_best_confidence,
+                {
+                    "done": END,
+                    "escalate": "escalate"
+                }
+            )
+    else:
+        workflow.add_node("retry", retry_node)
+
+        # 각 에이전트 후 신뢰도 체크
+        for agent in agent_nodes:
+            workflow.add_conditional_edges(
+                agent,
+                check_confidence,
+                {
+                    "done": END,
+                    "retry": "retry",
+                    "escalate": "escalate"
+                }
+            )
+
+        # 재시도는 분류기로 다시 (카테고리는 유지)
+        workflow.add_conditional_edges(
+            "retry",
+            route_query,
+            {
+                "tech_support": "tech_support",
+                "billing": "billing",
+                "general": "general"
+            }
+        )
+
+    workflow.add_edge("escalate", END)
+    return workflow
+
+# 컴파일
+app = build_workflow().compile()
+async_app = build_workflow(async_mode=True).compile()
+
+def initial_state(query: str) -> CustomerState:
+    return {
+        "query": query,
+        "category": "",
+        "response": "",
+        "confidence": 0.0,
+        "retry_count": 0,  # 초기값
+        "classified_by": ""
     }
-)
 
-workflow.add_edge("escalate", END)
+async def arun_queries(queries: list, max_in_flight: int = 100) -> list:
+    """하나의 이벤트 루프에서 여러 문의를 동시에 처리
+    max_in_flight : 동시에 백엔드로 보내는 최대 문의 수"""
+    semaphore = asyncio.Semaphore(max_in_flight)
 
-# 컴파일
-app = workflow.compile()
+    async def run_one(query: str):
+        async with semaphore:
+            return await async_app.ainvoke(initial_state(query))
+
+    return await asyncio.gather(*(run_one(q) for q in queries))
 
 if __name__ == "__main__":
     queries = [
@@ -126,15 +199,20 @@ if __name__ == "__main__":
         print(f"문의: {query}")
         print(f"{'='*60}")
         
-        result = app.invoke({
-            "query": query,
-            "category": "",
-            "response": "",
-            "confidence": 0.0,
-            "retry_count": 0  # 초기값
-        })
+        result = app.invoke(initial_state(query))
         
-        print(f"\n분류: {result['category']}")
+        print(f"\n분류: {result['category']} ({result['classified_by']} 단계)")
         print(f"신뢰도: {result['confidence']:.2f}")
         print(f"재시도: {result['retry_count']}회")
-        print(f"답변: {result['response'][:150]}...")
\ No newline at end of file
+        print(f"답변: {result['response'][:150]}...")
+
+    # 비동기 동시 처리
+    print(f"\n{'='*60}")
+    print("비동기 동시 처리")
+    print(f"{'='*60}")
+    results = asyncio.run(arun_queries(queries))
+    for result in results:
+        print(f"[{result['category']}] {result['query']} (신뢰도 {result['confidence']:.2f})")
+
+    print(f"\n응답 캐시: {cache_stats()}")
+    print(f"분류 단계: {cascade.stats()}")
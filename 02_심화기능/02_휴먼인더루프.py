@@ -13,10 +13,15 @@
 
 from langchain_ollama import ChatOllama
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 from typing import TypedDict, Annotated, Literal
 from langchain_core.messages import HumanMessage, AIMessage
 import operator
+import sys
+from pathlib import Path
+
+# 체크포인터 모듈은 01_기초개념설립/checkpointer 에 있음
+sys.path.append(str(Path(__file__).resolve().parent.parent / "01_기초개념설립"))
+from checkpointer.bounded_memory import BoundedMemorySaver
 
 # 상태 정의
 class ApprovalState(TypedDict):
@@ -119,8 +124,8 @@ workflow.add_conditional_edges(
 
 workflow.add_edge("final", END)
 
-# 메모리 체크포인터
-memory = MemorySaver()
+# 메모리 체크포인터 (승인 대기 thread가 쌓여도 max_bytes 이상은 디스크로 내보냄)
+memory = BoundedMemorySaver(max_bytes=64 * 1024 * 1024)
 
 app = workflow.compile(
     checkpointer=memory,
@@ -9,12 +9,32 @@ Manager (관리자)
 
 [순환 흐름]
 Manager → Researcher → Manager → Analyzer → Manager → Writer → END
+
+[라우터 합치기 (FUSE_ROUTERS = True)]
+Manager는 상태만 보고 다음 Worker를 정하는 순수 함수이므로 노드 대신 조건부 엣지로 인라인
+Researcher → Analyzer → Writer → END  (superstep / 체크포인트 저장 횟수 감소)
+벤치마크 : python 04_복잡한멀티에이전트_계층구조.py bench
+
+[스트리밍 파이프라인 (PIPELINED_ANALYSIS = True)]
+Researcher가 스트리밍하는 동안 완성된 문장/불릿 단위로 Analyzer가 부분 분석을 먼저 시작
+=> 조사가 끝나면 마지막 조각 분석만 남음 (조사 이후 지연 : 전체 분석 1회 → 마지막 조각 분석 1회)
+부분 분석은 따로 합치지 않고 Writer가 전체 조사 결과와 함께 받아 보고서에서 종합
+
+[여러 주제 배치 처리]
+단계마다 워커 풀을 두고 주제 A 분석 중에 주제 B 조사를 겹쳐 실행
+python 04_복잡한멀티에이전트_계층구조.py batch 주제1 주제2 주제3 ...
 '''
 from langchain_ollama import ChatOllama
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated, Literal
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 import operator # 수학/논리 연산자를 함수 형태로 제공하는 라이브러리
+import sys
+import time
+from agent.reduce import fit_to_context
+from agent.graph_opt import add_fused_router
+from agent.pipeline import pipelined_stage
+from agent.stage_pool import StagePipeline
 
 # 상태 정의
 class ResearchState(TypedDict):
@@ -23,6 +43,7 @@ class ResearchState(TypedDict):
     topic: str
     research_data: str
     analysis_result: str
+    analysis_parts: list # 파이프라인 모드의 조각별 부분 분석 (조사 결과 앞부분부터 순서대로)
     final_report: str
     current_worker: str
 
@@ -33,25 +54,36 @@ llm = ChatOllama(
     temperature=0.7
 )
 
+# 라우터 노드를 조건부 엣지로 합칠지 여부
+FUSE_ROUTERS = True
+
+# 조사 스트리밍 중에 분석을 미리 시작할지 여부 (True면 Analyzer 노드 대신 Researcher 안에서 분석까지 수행)
+PIPELINED_ANALYSIS = True
+
+# Manager 판단 (순수 함수 : 상태만 읽고 업데이트만 반환)
+def decide_next_worker(state: ResearchState) -> ResearchState:
+    if not state.get("research_data", ""):
+        return {"current_worker": "researcher"}
+    elif not state.get("analysis_result", ""):
+        return {"current_worker": "analyzer"}
+    return {"current_worker": "writer"}
+
 # Manager 노드
 def manager_node(state: ResearchState) -> ResearchState:
     """Manager가 작업을 분석하고 다음 Worker 결정"""
     
     topic = state.get("topic", "")
-    research_data = state.get("research_data", "")
-    analysis_result = state.get("analysis_result", "")
+    update = decide_next_worker(state)
+    next_worker = update["current_worker"]
     
-    if not research_data:
-        next_worker = "researcher"
+    if next_worker == "researcher":
         print(f"\n[Manager] 주제 '{topic}' 분석 완료 → Researcher에게 할당")
-    elif not analysis_result:
-        next_worker = "analyzer"
+    elif next_worker == "analyzer":
         print(f"\n[Manager] 조사 완료 → Analyzer에게 할당")
     else:
-        next_worker = "writer"
         print(f"\n[Manager] 분석 완료 → Writer에게 할당")
     
-    return {"current_worker": next_worker}
+    return update
 
 # Worker 1: Researcher
 def researcher_node(state: ResearchState) -> ResearchState:
@@ -75,14 +107,34 @@ def analyzer_node(state: ResearchState) -> ResearchState:
     research_data = state["research_data"]
     print(f"\n[Analyzer] 데이터 분석 시작...")
     
-    prompt = f"다음 조사 결과를 분석하고 주요 인사이트를 도출하세요:\n\n{research_data}"
-    response = llm.invoke([HumanMessage(content=prompt)])
-    
-    analysis_result = response.content
+    analysis_result = analyze(research_data)
     print(f"분석 결과: {analysis_result[:80]}...")
     
     return {"analysis_result": analysis_result}
 
+def analyze(research_data: str) -> str:
+    prompt = f"다음 조사 결과를 분석하고 주요 인사이트를 도출하세요:\n\n{research_data}"
+    return llm.invoke([HumanMessage(content=prompt)]).content
+
+# Worker 1+2: 스트리밍 파이프라인 (조사 생성과 부분 분석을 겹쳐 실행)
+def pipelined_research_node(state: ResearchState) -> ResearchState:
+    """조사를 스트리밍하면서 완성된 부분부터 분석 시작"""
+    
+    topic = state["topic"]
+    print(f"\n[Researcher → Analyzer] '{topic}' 조사 및 부분 분석 시작...")
+    
+    prompt = f"주제 '{topic}'에 대한 핵심 정보 3가지를 간단히 조사하세요."
+    chunks = (chunk.content for chunk in llm.stream([HumanMessage(content=prompt)]))
+    research_data, partials = pipelined_stage(chunks, analyze)
+    
+    # 부분 분석은 합치지 않고 그대로 Writer에 전달 (종합은 보고서 작성 시 한 번에)
+    analysis_result = "\n\n".join(partials)
+    print(f"조사 결과: {research_data[:80]}...")
+    print(f"분석 결과 ({len(partials)}개 부분 분석): {analysis_result[:80]}...")
+    
+    # 두 필드를 모두 채우므로 다음 라우팅은 바로 Writer
+    return {"research_data": research_data, "analysis_result": analysis_result, "analysis_parts": partials}
+
 # Worker 3: Writer
 def writer_node(state: ResearchState) -> ResearchState:
     """보고서 작성 담당"""
@@ -93,15 +145,23 @@ def writer_node(state: ResearchState) -> ResearchState:
     
     print(f"\n[Writer] 최종 보고서 작성 중...")
     
+    # 파이프라인 모드 : 조사 결과의 앞부분부터 나눠 분석한 조각들을 그대로 받아 보고서에서 종합
+    parts = state.get("analysis_parts") or []
+    if len(parts) > 1:
+        analyses = [f"부분 분석 {i}/{len(parts)} (조사 결과 일부 기준):\n{part}" for i, part in enumerate(parts, 1)]
+        guide = "부분 분석들은 조사 결과를 나눠 분석한 것이므로 중복은 합치고 조사 결과 전체를 기준으로 종합하여 "
+    else:
+        analyses = [f"분석 결과:\n{analysis_result}"]
+        guide = ""
+    
+    # 조사/분석 결과가 컨텍스트 한도를 넘으면 요약 후 사용
+    sections = "\n\n".join(fit_to_context([f"조사 결과:\n{research_data}"] + analyses, llm))
+    
     prompt = f"""주제: {topic}
 
-조사 결과:
-{research_data}
-
-분석 결과:
-{analysis_result}
+{sections}
 
-위 내용을 바탕으로 간단한 보고서를 작성하세요."""
+위 내용을 바탕으로 {guide}간단한 보고서를 작성하세요."""
 
     response = llm.invoke([HumanMessage(content=prompt)])
     
@@ -128,51 +188,145 @@ def route_to_worker(state: ResearchState) -> Literal["researcher", "analyzer", "
     else:
         return "end"
 
+WORKER_PATHS = {
+    "researcher": "researcher",
+    "analyzer": "analyzer",
+    "writer": "writer",
+    "end": END
+}
+
 # 그래프 생성
-workflow = StateGraph(ResearchState)
-
-# 노드 추가
-workflow.add_node("manager", manager_node)
-workflow.add_node("researcher", researcher_node)
-workflow.add_node("analyzer", analyzer_node)
-workflow.add_node("writer", writer_node)
-
-# 엣지 설정
-workflow.set_entry_point("manager")
-
-# Manager가 Worker 결정
-workflow.add_conditional_edges(
-    "manager",
-    route_to_worker,
-    {
-        "researcher": "researcher",
-        "analyzer": "analyzer",
-        "writer": "writer",
-        "end": END
+def build_workflow(fuse_routers: bool = FUSE_ROUTERS, pipelined: bool = PIPELINED_ANALYSIS) -> StateGraph:
+    workflow = StateGraph(ResearchState)
+
+    # 노드 추가 (파이프라인이면 Researcher가 분석까지 하므로 Analyzer 노드 없음)
+    workflow.add_node("researcher", pipelined_research_node if pipelined else researcher_node)
+    workflow.add_node("writer", writer_node)
+    workflow.add_edge("writer", END)
+    if pipelined:
+        path_map = {**WORKER_PATHS, "analyzer": "writer"}  # 분석 결과가 비어 있어도 없는 노드로 가지 않도록
+        workers = ["researcher"]
+    else:
+        workflow.add_node("analyzer", analyzer_node)
+        path_map = WORKER_PATHS
+        workers = ["researcher", "analyzer"]
+
+    if fuse_routers:
+        # Manager 노드 없이 시작점과 각 Worker 뒤에서 바로 다음 Worker 결정
+        add_fused_router(
+            workflow,
+            router=decide_next_worker,
+            route=route_to_worker,
+            path_map=path_map,
+            sources=workers,
+            entry=True,
+        )
+        return workflow
+
+    workflow.add_node("manager", manager_node)
+
+    # 엣지 설정
+    workflow.set_entry_point("manager")
+
+    # Manager가 Worker 결정
+    workflow.add_conditional_edges("manager", route_to_worker, path_map)
+
+    # 각 Worker 완료 후 다시 Manager로
+    for worker in workers:
+        workflow.add_edge(worker, "manager")
+    return workflow
+
+app = build_workflow().compile()
+
+def save_graph_img(app) -> None:
+    img = input("파일이름을 입력하세요 : ")
+    file_path = f"img/{img}"
+
+    try:
+        png_data = app.get_graph().draw_mermaid_png()
+        with open(file_path, "wb") as f:
+            f.write(png_data)
+        print(f"그래프 이미지 저장됨: {file_path}")
+    except Exception as e:
+        print(f"PNG 저장 실패: {e}")
+        print("Graphviz가 설치되지 않았을 수 있습니다.")
+
+def benchmark_router_fusion(runs: int = 50) -> None:
+    """라우터 합치기 전/후 비교 : LLM은 가짜 모델로 바꿔 그래프 오버헤드만 측정"""
+    global llm
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from langgraph.checkpoint.memory import MemorySaver
+
+    original_llm = llm
+    llm = FakeListChatModel(responses=["- 핵심 정보 1\n- 핵심 정보 2\n- 핵심 정보 3"])
+    initial = {
+        "messages": [],
+        "topic": "벤치마크",
+        "research_data": "",
+        "analysis_result": "",
+        "final_report": "",
+        "current_worker": ""
     }
-)
 
-# 각 Worker 완료 후 다시 Manager로
-workflow.add_edge("researcher", "manager")
-workflow.add_edge("analyzer", "manager")
-workflow.add_edge("writer", END)
+    print(f"\n{'구성':<10}{'superstep':>10}{'체크포인트':>12}{'평균(ms)':>12}")
+    try:
+        for label, fuse_routers in [("기존", False), ("합치기", True)]:
+            bench_app = build_workflow(fuse_routers, pipelined=False).compile(checkpointer=MemorySaver())
+            start = time.perf_counter()
+            for i in range(runs):
+                config = {"configurable": {"thread_id": f"bench-{label}-{i}"}}
+                bench_app.invoke(initial, config=config)
+            elapsed = (time.perf_counter() - start) / runs * 1000
 
-app = workflow.compile()
+            history = list(bench_app.get_state_history(config))
+            steps = max(snapshot.metadata["step"] for snapshot in history) + 1
+            print(f"{label:<10}{steps:>10}{len(history):>12}{elapsed:>12.2f}")
+    finally:
+        llm = original_llm
 
-img = input("파일이름을 입력하세요 : ")
-file_path = f"img/{img}"
+# 배치 처리 시 단계별 워커 수 (백엔드 동시 처리 용량에 맞춰 조정)
+STAGE_WORKERS = {"researcher": 2, "analyzer": 2, "writer": 2}
+
+def run_batch(topics: list, workers: dict = STAGE_WORKERS) -> list:
+    """여러 주제를 단계별 워커 풀로 동시에 처리 => 주제 순서대로 최종 상태 반환"""
+    pipeline = StagePipeline([
+        ("researcher", researcher_node, workers["researcher"]),
+        ("analyzer", analyzer_node, workers["analyzer"]),
+        ("writer", writer_node, workers["writer"]),
+    ])
+    results = pipeline.run([
+        {
+            "messages": [],
+            "topic": topic,
+            "research_data": "",
+            "analysis_result": "",
+            "final_report": "",
+            "current_worker": ""
+        }
+        for topic in topics
+    ])
+
+    metrics = pipeline.metrics()
+    print(f"\n[Batch] 주제 {len(topics)}개 / {metrics['elapsed']:.2f}초")
+    for name in workers:
+        stage = metrics[name]
+        print(f"  {name:<10} 처리 {stage['processed']}건, 최대 대기 {stage['queue_depth_max']}, "
+              f"평균 대기 {stage['queue_depth_avg']:.1f}, 가동률 {stage['utilization']:.0%}")
+    return results
 
-try:
-    png_data = app.get_graph().draw_mermaid_png()
-    with open(file_path, "wb") as f:
-        f.write(png_data)
-    print(f"그래프 이미지 저장됨: {file_path}")
-except Exception as e:
-    print(f"PNG 저장 실패: {e}")
-    print("Graphviz가 설치되지 않았을 수 있습니다.")
-    
 # 테스트
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark_router_fusion()
+        sys.exit(0)
+
+    if len(sys.argv) > 2 and sys.argv[1] == "batch":
+        for result in run_batch(sys.argv[2:]):
+            print(f"\n{'='*60}\n[{result['topic']}]\n{result.get('final_report') or result.get('error')}")
+        sys.exit(0)
+
+    save_graph_img(app)
+
     print("=== 계층형 멀티 에이전트 시스템 ===")
     
     topic = input("\n조사할 주제를 입력하세요: ")
@@ -192,4 +346,4 @@ if __name__ == "__main__":
     print("\n" + "="*60)
     print("최종 보고서")
     print("="*60)
-    print(result["final_report"])
\ No newline at end of file
+    print(result["final_report"])
@@ -3,6 +3,14 @@ from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated
 from langchain_core.messages import HumanMessage, AIMessage
 import operator
+import os
+import threading
+import uuid
+from agent.fanout import BranchRunner, PooledLLM
+from agent.incremental import IncrementalAggregator
+from agent.hedge import HedgedCaller
+from agent.llm_pool import get_llm
+from agent.reduce import fit_to_context
 
 def langgraph_img(app : StateGraph) :
     img = input("파일이름을 입력하세요 : ")
@@ -24,6 +32,8 @@ class ParallelState(TypedDict):
     db_result: str
     api_result: str
     final_report: str
+    branch_status: Annotated[dict, operator.or_] # 분기별 완료 상태 (ok / late / timeout / error)
+    run_id: str # 실행별 점진적 통합기 식별자
 
 llm = ChatOllama(
     model="qwen2.5:3b",
@@ -31,6 +41,51 @@ llm = ChatOllama(
     temperature=0.12
 )
 
+# 분기 실행 설정
+MAX_CONCURRENCY = {"ollama": 2}   # 백엔드별 최대 동시 요청 수
+BRANCH_TIMEOUT = 60.0             # 분기별 제한 시간(초)
+LATE_POLICY = "placeholder"       # 제한 시간 초과 시 : drop / placeholder / wait
+
+runner = BranchRunner(max_concurrency=MAX_CONCURRENCY, timeout=BRANCH_TIMEOUT, late_policy=LATE_POLICY)
+
+# 헤지 요청 : 분기가 최근 p95 응답 시간을 넘기면 레플리카로 중복 요청 (레플리카가 없으면 사용 안 함)
+# 예) export OLLAMA_REPLICAS=http://gpu2:11434,http://gpu3:11434
+HEDGE_REPLICAS = [url for url in os.environ.get("OLLAMA_REPLICAS", "").split(",") if url]
+hedged = HedgedCaller(
+    [llm] + [get_llm(model="qwen2.5:3b", temperature=0.12, base_url=url) for url in HEDGE_REPLICAS],
+    percentile=0.95,
+    budget=0.1,  # 전체 요청의 10%까지만 헤지
+)
+
+# 점진적 통합 : 분기 결과가 도착할 때마다 요약에 병합하고, 마지막 분기만 최종 단계에서 합침
+#  - 병합/최종 프롬프트도 fit_to_context로 컨텍스트 한도 안에서 작성
+#  - 병합 LLM 호출도 분기와 같은 백엔드 풀(MAX_CONCURRENCY)에서 실행
+#  - run_research(topic)으로 실행할 때만 사용 (app.invoke 직접 호출 시 기존 일괄 통합)
+INCREMENTAL_AGGREGATION = True
+
+BRANCH_LABELS = {
+    "web": "웹 조사 결과",
+    "db": "데이터베이스 조사 결과",
+    "api": "API 조사 결과",
+}
+
+# run_id → IncrementalAggregator (그래프 상태에는 직렬화 가능한 값만 두기 위해 밖에서 관리)
+# 등록/제거는 run_research의 try/finally에서만 => 실행이 실패해도 남지 않음
+_aggregators: dict = {}
+_aggregators_lock = threading.Lock()
+
+def _research(state: ParallelState, branch: str, prompt: str) -> tuple:
+    """LLM 조사를 제한된 동시성/시간 안에서 실행 => (내용, 상태)"""
+    result, status = runner.run(branch, hedged.invoke, [HumanMessage(content=prompt)], backend="ollama")
+    content = result.content if hasattr(result, "content") else (result or "")
+    
+    # 도착 즉시 점진적 통합기에 전달
+    with _aggregators_lock:
+        aggregator = _aggregators.get(state.get("run_id", ""))
+    if aggregator:
+        aggregator.add(BRANCH_LABELS[branch], content, ok=status in ("ok", "late"))
+    return content, status
+
 # Agent 노드 (시작점)
 def agent_node(state: ParallelState) -> ParallelState:
     """주제를 분석하고 병렬 조사 시작"""
@@ -46,41 +101,56 @@ def agent_node(state: ParallelState) -> ParallelState:
 def researcher_web(state: ParallelState) -> ParallelState:
     print("\n[Web Researcher] 웹 조사 시작...")
     prompt = f"웹에서 '{state['topic']}'에 대한 정보를 조사하세요."
-    result = llm.invoke([HumanMessage(content=prompt)])
-    print(f"[Web] 완료: {result.content[:50]}...")
-    return {"web_result": result.content}
+    content, status = _research(state, "web", prompt)
+    print(f"[Web] {status}: {content[:50]}...")
+    return {"web_result": content, "branch_status": {"web": status}}
 
 def researcher_db(state: ParallelState) -> ParallelState:
     print("\n[DB Researcher] 데이터베이스 조사 시작...")
     prompt = f"데이터베이스에서 '{state['topic']}'에 대한 데이터를 조사하세요."
-    result = llm.invoke([HumanMessage(content=prompt)])
-    print(f"[DB] 완료: {result.content[:50]}...")
-    return {"db_result": result.content}
+    content, status = _research(state, "db", prompt)
+    print(f"[DB] {status}: {content[:50]}...")
+    return {"db_result": content, "branch_status": {"db": status}}
 
 def researcher_api(state: ParallelState) -> ParallelState:
     print("\n[API Researcher] API 조사 시작...")
     prompt = f"API를 통해 '{state['topic']}'에 대한 최신 정보를 조사하세요."
-    result = llm.invoke([HumanMessage(content=prompt)])
-    print(f"[API] 완료: {result.content[:50]}...")
-    return {"api_result": result.content}
+    content, status = _research(state, "api", prompt)
+    print(f"[API] {status}: {content[:50]}...")
+    return {"api_result": content, "branch_status": {"api": status}}
 
 # 통합 노드
 def aggregator_node(state: ParallelState) -> ParallelState:
     """3개 Researcher 결과를 통합"""
     print("\n[Aggregator] 결과 통합 중...")
     
-    prompt = f"""다음 3가지 조사 결과를 통합하여 종합 보고서를 작성하세요.
+    with _aggregators_lock:
+        aggregator = _aggregators.get(state.get("run_id", ""))
+    if aggregator:
+        # 앞서 도착한 분기는 이미 병합됨 => 마지막 분기만 합쳐 보고서 작성
+        report = aggregator.finish()
+        print("\n[Aggregator] 통합 완료! (점진적 통합)")
+        return {
+            "final_report": report,
+            "messages": [AIMessage(content=report)]
+        }
+    
+    # 제한 시간 안에 도착한 분기만 통합
+    status = state.get("branch_status", {})
+    branches = [(name, label, state[f"{name}_result"]) for name, label in BRANCH_LABELS.items()]
+    arrived = [(label, content) for name, label, content in branches if status.get(name, "ok") in ("ok", "late") and content]
+    missing = [label for name, label, _ in branches if status.get(name, "ok") not in ("ok", "late")]
+    print(f"[Aggregator] 도착 {len(arrived)}개 / 누락: {missing or '없음'}")
+    
+    # 컨텍스트 한도를 넘으면 묶음별 병렬 요약 후 통합
+    results = "\n\n".join(fit_to_context([f"{label}:\n{content}" for label, content in arrived], llm))
+    note = f"\n\n(다음 조사는 제한 시간 내에 완료되지 않아 제외되었습니다: {', '.join(missing)})" if missing else ""
+    
+    prompt = f"""다음 조사 결과를 통합하여 종합 보고서를 작성하세요.
 
                 주제: {state['topic']}
 
-                웹 조사 결과:
-                {state['web_result']}
-
-                데이터베이스 조사 결과:
-                {state['db_result']}
-
-                API 조사 결과:
-                {state['api_result']}
+                {results}{note}
 
                 위 내용을 간단히 통합하여 보고서를 작성하세요."""
 
@@ -122,6 +192,30 @@ app = workflow.compile()
 
 langgraph_img(app)
 
+def run_research(topic: str) -> dict:
+    """그래프 실행 (INCREMENTAL_AGGREGATION이면 실행 동안만 점진적 통합기를 등록)"""
+    run_id = ""
+    if INCREMENTAL_AGGREGATION:
+        run_id = uuid.uuid4().hex
+        with _aggregators_lock:
+            _aggregators[run_id] = IncrementalAggregator(PooledLLM(llm, runner, backend="ollama"), topic, expected=len(BRANCH_LABELS))
+    try:
+        return app.invoke({
+            "messages": [HumanMessage(content=topic)],
+            "topic": "",
+            "web_result": "",
+            "db_result": "",
+            "api_result": "",
+            "final_report": "",
+            "branch_status": {},
+            "run_id": run_id
+        })
+    finally:
+        with _aggregators_lock:
+            aggregator = _aggregators.pop(run_id, None)
+        if aggregator:
+            aggregator.close()
+
 
 # 테스트
 if __name__ == "__main__":
@@ -134,14 +228,7 @@ if __name__ == "__main__":
     print(f"\n{'='*60}")
     start = time.time()
     
-    result = app.invoke({
-        "messages": [HumanMessage(content=topic)],
-        "topic": "",
-        "web_result": "",
-        "db_result": "",
-        "api_result": "",
-        "final_report": ""
-    })
+    result = run_research(topic)
     
     end = time.time()
     
@@ -151,4 +238,6 @@ if __name__ == "__main__":
     print(result["final_report"])
     
     print(f"\n{'='*60}")
-    print(f"총 실행 시간: {end - start:.2f}초")
\ No newline at end of file
+    print(f"총 실행 시간: {end - start:.2f}초")
+    if HEDGE_REPLICAS:
+        print(f"헤지 통계: {hedged.stats()}")
\ No newline at end of file
@@ -0,0 +1,154 @@
+'''
+주제를 여러 하위 질문으로 나누고, 하위 질문 수만큼 Researcher를 동적으로 띄우는 구조
+ - 05_복잡한멀티에이전트_병렬Worker.py 는 web/db/api 3개 분기가 고정
+ - 여기서는 planner가 나눈 하위 질문 개수(N)만큼 Send로 worker를 실행 (map 단계)
+ - 결과는 operator.add 리듀서로 리스트에 모아 aggregator가 통합 (reduce 단계)
+
+[흐름]
+planner → Send × N → researcher(병렬) → aggregate → END
+'''
+from langchain_ollama import ChatOllama
+from langgraph.graph import StateGraph, END
+from langgraph.types import Send
+from typing import TypedDict, Annotated
+from langchain_core.messages import HumanMessage, AIMessage
+import operator
+import re
+from agent.fanout import BranchRunner
+from agent.reduce import fit_to_context
+
+# 상태 정의
+class DynamicState(TypedDict):
+    messages: Annotated[list, operator.add]
+    topic: str
+    sub_queries: list
+    results: Annotated[list, operator.add] # 각 worker 결과가 누적됨
+    final_report: str
+
+# worker 하나가 받는 상태 (Send로 전달)
+class WorkerState(TypedDict):
+    topic: str
+    sub_query: str
+    index: int
+
+llm = ChatOllama(
+    model="qwen2.5:3b",
+    base_url="http://localhost:11434",
+    temperature=0.12
+)
+
+# 동적 분기 설정
+MAX_WIDTH = 6                     # 한 번에 띄울 worker 최대 수
+MAX_CONCURRENCY = {"ollama": 4}   # 백엔드가 감당할 수 있는 동시 요청 수
+BRANCH_TIMEOUT = 60.0
+
+runner = BranchRunner(max_concurrency=MAX_CONCURRENCY, timeout=BRANCH_TIMEOUT, late_policy="drop")
+
+# Planner 노드 : 주제를 하위 질문으로 분해
+def planner_node(state: DynamicState) -> DynamicState:
+    topic = state["messages"][0].content
+
+    prompt = f"""주제 '{topic}'을 조사하기 위한 하위 질문을 최대 {MAX_WIDTH}개 작성하세요.
+주제가 좁으면 적게, 넓으면 많이 작성하세요.
+한 줄에 하나씩 "1. 질문" 형식으로만 출력하세요."""
+    response = llm.invoke([HumanMessage(content=prompt)])
+
+    sub_queries = re.findall(r'^\s*\d+[.)]\s*(.+?)\s*$', response.content, re.MULTILINE)
+    sub_queries = sub_queries[:MAX_WIDTH] or [topic]  # 파싱 실패 시 주제 하나로 진행
+
+    print(f"\n[Planner] 주제 '{topic}' → 하위 질문 {len(sub_queries)}개")
+    for i, query in enumerate(sub_queries, 1):
+        print(f"  {i}. {query}")
+
+    return {"topic": topic, "sub_queries": sub_queries}
+
+# 하위 질문마다 worker 하나씩 동적으로 생성
+def dispatch_researchers(state: DynamicState) -> list:
+    return [
+        Send("researcher", {"topic": state["topic"], "sub_query": query, "index": i})
+        for i, query in enumerate(state["sub_queries"])
+    ]
+
+# Researcher (N개 병렬 실행)
+def researcher_node(state: WorkerState) -> DynamicState:
+    print(f"\n[Researcher {state['index'] + 1}] {state['sub_query']}")
+    prompt = f"주제 '{state['topic']}'와 관련하여 다음 질문을 조사하세요: {state['sub_query']}"
+    result, status = runner.run(f"researcher-{state['index'] + 1}", llm.invoke, [HumanMessage(content=prompt)], backend="ollama")
+
+    content = result.content if hasattr(result, "content") else (result or "")
+    return {"results": [{"index": state["index"], "sub_query": state["sub_query"], "content": content, "status": status}]}
+
+# 통합 노드
+def aggregator_node(state: DynamicState) -> DynamicState:
+    print("\n[Aggregator] 결과 통합 중...")
+
+    # 완료 순서가 아니라 질문 순서대로 정렬
+    results = sorted(state["results"], key=lambda r: r["index"])
+    arrived = [r for r in results if r["status"] in ("ok", "late") and r["content"]]
+    print(f"[Aggregator] 도착 {len(arrived)}/{len(results)}개")
+
+    # 분기 수가 많아 컨텍스트를 넘으면 계층적으로 요약
+    sections = "\n\n".join(fit_to_context([f"[{r['sub_query']}]\n{r['content']}" for r in arrived], llm))
+    prompt = f"""다음 하위 질문별 조사 결과를 통합하여 종합 보고서를 작성하세요.
+
+주제: {state['topic']}
+
+{sections}
+
+위 내용을 간단히 통합하여 보고서를 작성하세요."""
+
+    result = llm.invoke([HumanMessage(content=prompt)])
+
+    return {
+        "final_report": result.content,
+        "messages": [AIMessage(content=result.content)]
+    }
+
+# 그래프 생성
+workflow = StateGraph(DynamicState)
+
+workflow.add_node("planner", planner_node)
+workflow.add_node("researcher", researcher_node)
+workflow.add_node("aggregate", aggregator_node)
+
+workflow.set_entry_point("planner")
+
+# planner → researcher × N (Send 리스트 반환)
+workflow.add_conditional_edges("planner", dispatch_researchers, ["researcher"])
+
+# 모든 researcher 완료 후 aggregate
+workflow.add_edge("researcher", "aggregate")
+workflow.add_edge("aggregate", END)
+
+app = workflow.compile()
+
+# 테스트
+if __name__ == "__main__":
+    import time
+
+    print("=== 동적 병렬 멀티 에이전트 시스템 ===")
+
+    topic = input("\n조사할 주제: ")
+
+    start = time.time()
+    result = app.invoke(
+        {
+            "messages": [HumanMessage(content=topic)],
+            "topic": "",
+            "sub_queries": [],
+            "results": [],
+            "final_report": ""
+        },
+        config={"max_concurrency": MAX_WIDTH}  # 그래프가 동시에 실행할 노드 수 상한
+    )
+    end = time.time()
+
+    print(f"\n{'='*60}")
+    print("최종 통합 보고서")
+    print('='*60)
+    print(result["final_report"])
+
+    print(f"\n{'='*60}")
+    print(f"하위 질문 {len(result['sub_queries'])}개 / 총 실행 시간: {end - start:.2f}초")
+    for branch, timing in sorted(runner.stats().items()):
+        print(f"  {branch}: 큐 대기 {timing['queued']:.2f}초 / 실행 {timing['ran']:.2f}초")
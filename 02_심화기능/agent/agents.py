@@ -1,6 +1,12 @@
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_ollama import ChatOllama
-from typing import TypedDict
+from typing import TypedDict, Optional
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from agent import llm_pool
+from agent.llm_cache import node_cache
 
 class CustomerState(TypedDict):
     query: str
@@ -8,17 +14,18 @@ class CustomerState(TypedDict):
     response: str
     confidence: float
     
-def get_llm(model="devna0111-7b-q4",temperature=0.7) :
-    llm = ChatOllama(
-        model=model,
-        base_url="http://localhost:11434",
-        temperature=temperature, # 현재 RAG 등 참고자료가 없어 내용 응답이 불가하여 실습 간 창의적 대답을 유도
-    )
-    return llm
+# 신뢰도 산정 방식 (에이전트 함수의 confidence_mode 인자 기본값)
+#  - "separate" : 답변 생성 후 evaluate_confidence로 한 번 더 호출 (LLM 2회)
+#  - "single"   : 답변과 자기평가 점수를 JSON 하나로 함께 생성 (LLM 1회), 파싱 실패 시 separate로 대체
+CONFIDENCE_MODE = "separate"
 
-def evaluate_confidence(query: str, category: str, response: str) -> float:
-    """답변의 신뢰도를 평가하는 함수"""
-    llm = get_llm(temperature=0.1)
+def get_llm(model="devna0111-7b-q4",temperature=0.7, cache=None, **kwargs) -> ChatOllama :
+    # 매 호출마다 새로 만들지 않고 레지스트리에서 공유 클라이언트를 받아옴
+    # temperature 0.7 : 현재 RAG 등 참고자료가 없어 내용 응답이 불가하여 실습 간 창의적 대답을 유도
+    # cache : 응답 캐시 (node_cache()로 opt-in 된 노드만 전달)
+    return llm_pool.get_llm(model=model, temperature=temperature, cache=cache, **kwargs)
+
+def _eval_messages(query: str, category: str, response: str) -> list:
     eval_prompt = f"""
                     다음 고객 문의와 답변을 평가하세요.
 
@@ -35,65 +42,163 @@ def evaluate_confidence(query: str, category: str, response: str) -> float:
 
                     신뢰도 점수:
                     """
+    return [HumanMessage(content=eval_prompt)]
 
-    messages = [HumanMessage(content=eval_prompt)]
+def _parse_score(score_text: str) -> float:
+    # 숫자만 추출
+    numbers = re.findall(r'0?\.\d+|[01]\.0|[01]', score_text.strip())
+    
+    if numbers:
+        score = float(numbers[0])
+        return max(0.0, min(1.0, score))  # 0~1 범위로 제한
+    else:
+        return 0.5  # 파싱 실패시 중간값
+
+def evaluate_confidence(query: str, category: str, response: str) -> float:
+    """답변의 신뢰도를 평가하는 함수"""
+    llm = get_llm(temperature=0.1, cache=node_cache("evaluate"))
+    messages = _eval_messages(query, category, response)
     
     try:
         result = llm.invoke(messages)
-        score_text = result.content.strip()
-        
-        # 숫자만 추출
-        import re
-        numbers = re.findall(r'0?\.\d+|[01]\.0|[01]', score_text)
-        
-        if numbers:
-            score = float(numbers[0])
-            return max(0.0, min(1.0, score))  # 0~1 범위로 제한
-        else:
-            return 0.5  # 파싱 실패시 중간값
+        return _parse_score(result.content)
             
     except Exception as e:
         print(f"평가 오류: {e}")
         return 0.5
 
-def tech_support_agent(state: CustomerState) -> CustomerState:
-    """기술 지원 전문 에이전트"""
-    llm = get_llm()
-    system_prompt = """
+async def aevaluate_confidence(query: str, category: str, response: str) -> float:
+    """evaluate_confidence의 비동기 버전"""
+    llm = get_llm(temperature=0.1, cache=node_cache("evaluate"))
+    messages = _eval_messages(query, category, response)
+    
+    try:
+        result = await llm.ainvoke(messages)
+        return _parse_score(result.content)
+            
+    except Exception as e:
+        print(f"평가 오류: {e}")
+        return 0.5
+
+# 답변 + 신뢰도를 한 번에 받기 위한 출력 형식 지시
+SELF_ASSESS_PROMPT = """
+                    답변을 작성한 뒤 스스로 신뢰도를 평가하세요.
+                    평가 기준: 문의와 답변의 관련성(0-0.4), 구체성과 명확성(0-0.3), 완성도(0-0.3)
+
+                    **반드시 아래 JSON 형식으로만 출력하세요. 다른 텍스트는 절대 포함하지 마세요.**
+                    {"answer": "고객에게 보낼 답변", "confidence": 0.0에서 1.0 사이의 숫자}
+                    """
+
+def _parse_self_assessed(text: str) -> Optional[tuple]:
+    """JSON 응답에서 (답변, 신뢰도) 추출, 형식이 맞지 않으면 None"""
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+        answer = data["answer"]
+        confidence = float(data["confidence"])
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not isinstance(answer, str) or not answer.strip() or not 0.0 <= confidence <= 1.0:
+        return None
+    return answer.strip(), confidence
+
+def _extract_answer(text: str) -> Optional[str]:
+    """점수 형식이 깨진 JSON 응답에서도 answer 필드의 문자열은 최대한 꺼냄"""
+    match = re.search(r'"answer"\s*:\s*"((?:[^"\\]|\\.)*)"', text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        answer = json.loads(f'"{match.group(1)}"', strict=False)
+    except ValueError:
+        return None
+    return answer.strip() or None
+
+def _plain_messages(state: CustomerState, system_prompt: str) -> list:
+    return [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=f"고객 문의: {state['query']}")
+    ]
+
+# 에이전트별 시스템 프롬프트
+TECH_SUPPORT_PROMPT = """
                         당신은 기술 지원 전문가입니다.
                         기술적 문제를 진단하고 해결 방법을 제시하세요.
                         단계별로 명확하게 설명하세요.
                         답변은 친화적이고 간결하게 합니다.
                     """
 
+BILLING_PROMPT = """
+                    당신은 결제 및 청구 전문가입니다.
+                    결제 문제를 확인하고 해결 방법을 안내하세요.
+                    환불 정책과 절차를 명확히 설명하세요.
+                    답변은 친화적이고 간결하게 합니다.
+                    """
+
+GENERAL_PROMPT = """
+                        당신은 고객 서비스 담당자입니다.
+                        친절하고 정중하게 일반 문의에 답변하세요.
+                        답변은 친화적이고 간결하게 합니다.
+                    """
+
+def _run_agent_single(state: CustomerState, system_prompt: str) -> CustomerState:
+    """답변과 신뢰도를 한 번의 호출로 생성"""
+    llm = get_llm(format="json")
     messages = [
-        SystemMessage(content=system_prompt),
+        SystemMessage(content=system_prompt + SELF_ASSESS_PROMPT),
         HumanMessage(content=f"고객 문의: {state['query']}")
     ]
     
     response = llm.invoke(messages)
-    confidence = evaluate_confidence(state['query'], state['category'], response.content)
+    parsed = _parse_self_assessed(response.content)
+    if parsed:
+        answer, confidence = parsed
+    else:
+        # 파싱 실패 => answer 필드만 꺼내고, 그것도 없으면 일반 모드로 다시 생성 (JSON 원문이 고객에게 가지 않도록)
+        answer = _extract_answer(response.content)
+        if answer is None:
+            answer = get_llm().invoke(_plain_messages(state, system_prompt)).content
+        confidence = evaluate_confidence(state['query'], state['category'], answer)
+    
     return {
         **state,
-        "response": response.content,
-        "confidence":confidence
+        "response": answer,
+        "confidence": confidence
     }
 
-def billing_agent(state: CustomerState) -> CustomerState:
-    """결제/청구 전문 에이전트"""
-    llm = get_llm()
-    system_prompt = """
-                    당신은 결제 및 청구 전문가입니다.
-                    결제 문제를 확인하고 해결 방법을 안내하세요.
-                    환불 정책과 절차를 명확히 설명하세요.
-                    답변은 친화적이고 간결하게 합니다.
-                    """
-
+async def _arun_agent_single(state: CustomerState, system_prompt: str) -> CustomerState:
+    """_run_agent_single의 비동기 버전"""
+    llm = get_llm(format="json")
     messages = [
-        SystemMessage(content=system_prompt),
+        SystemMessage(content=system_prompt + SELF_ASSESS_PROMPT),
         HumanMessage(content=f"고객 문의: {state['query']}")
     ]
     
+    response = await llm.ainvoke(messages)
+    parsed = _parse_self_assessed(response.content)
+    if parsed:
+        answer, confidence = parsed
+    else:
+        answer = _extract_answer(response.content)
+        if answer is None:
+            answer = (await get_llm().ainvoke(_plain_messages(state, system_prompt))).content
+        confidence = await aevaluate_confidence(state['query'], state['category'], answer)
+    
+    return {
+        **state,
+        "response": answer,
+        "confidence": confidence
+    }
+
+def _run_agent(state: CustomerState, system_prompt: str, confidence_mode: str = CONFIDENCE_MODE) -> CustomerState:
+    """답변 생성 + 신뢰도 평가 (공통)"""
+    if confidence_mode == "single":
+        return _run_agent_single(state, system_prompt)
+    
+    llm = get_llm()
+    messages = _plain_messages(state, system_prompt)
+    
     response = llm.invoke(messages)
     confidence = evaluate_confidence(state['query'], state['category'], response.content)
     
@@ -103,29 +208,74 @@ def billing_agent(state: CustomerState) -> CustomerState:
         "confidence":confidence
     }
 
-def general_agent(state: CustomerState) -> CustomerState:
-    """일반 문의 에이전트"""
+async def _arun_agent(state: CustomerState, system_prompt: str, confidence_mode: str = CONFIDENCE_MODE) -> CustomerState:
+    """_run_agent의 비동기 버전 : 대기 중에는 이벤트 루프가 다른 문의를 처리"""
+    if confidence_mode == "single":
+        return await _arun_agent_single(state, system_prompt)
+    
     llm = get_llm()
-    system_prompt = """
-                        당신은 고객 서비스 담당자입니다.
-                        친절하고 정중하게 일반 문의에 답변하세요.
-                        답변은 친화적이고 간결하게 합니다.
-                    """
-
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=f"고객 문의: {state['query']}")
-    ]
+    messages = _plain_messages(state, system_prompt)
     
-    response = llm.invoke(messages)
-    confidence = evaluate_confidence(state['query'], state['category'], response.content)
+    # 토큰 단위로 받아 이어붙임 (스트리밍 중에도 다른 코루틴이 실행됨)
+    content = ""
+    async for chunk in llm.astream(messages):
+        content += chunk.content
+    confidence = await aevaluate_confidence(state['query'], state['category'], content)
     
     return {
         **state,
-        "response": response.content,
+        "response": content,
         "confidence":confidence
     }
 
+def tech_support_agent(state: CustomerState, confidence_mode: str = CONFIDENCE_MODE) -> CustomerState:
+    """기술 지원 전문 에이전트"""
+    return _run_agent(state, TECH_SUPPORT_PROMPT, confidence_mode)
+
+def billing_agent(state: CustomerState, confidence_mode: str = CONFIDENCE_MODE) -> CustomerState:
+    """결제/청구 전문 에이전트"""
+    return _run_agent(state, BILLING_PROMPT, confidence_mode)
+
+def general_agent(state: CustomerState, confidence_mode: str = CONFIDENCE_MODE) -> CustomerState:
+    """일반 문의 에이전트"""
+    return _run_agent(state, GENERAL_PROMPT, confidence_mode)
+
+async def atech_support_agent(state: CustomerState, confidence_mode: str = CONFIDENCE_MODE) -> CustomerState:
+    """기술 지원 전문 에이전트 (비동기)"""
+    return await _arun_agent(state, TECH_SUPPORT_PROMPT, confidence_mode)
+
+async def abilling_agent(state: CustomerState, confidence_mode: str = CONFIDENCE_MODE) -> CustomerState:
+    """결제/청구 전문 에이전트 (비동기)"""
+    return await _arun_agent(state, BILLING_PROMPT, confidence_mode)
+
+async def ageneral_agent(state: CustomerState, confidence_mode: str = CONFIDENCE_MODE) -> CustomerState:
+    """일반 문의 에이전트 (비동기)"""
+    return await _arun_agent(state, GENERAL_PROMPT, confidence_mode)
+
+def _fn_name(fn) -> str:
+    # functools.partial로 인자를 고정한 에이전트도 원래 함수 이름 사용
+    return getattr(fn, "func", fn).__name__
+
+def best_of_n(agent_fn, n: int = 3):
+    """agent_fn을 n번 동시에 실행(답변+평가)하고 신뢰도가 가장 높은 후보를 반환하는 노드 생성
+    순차 재시도(최대 3회 직렬)를 한 번의 병렬 라운드로 대체"""
+    def node(state: CustomerState) -> CustomerState:
+        with ThreadPoolExecutor(max_workers=n) as executor:
+            candidates = list(executor.map(agent_fn, [state] * n))
+        return max(candidates, key=lambda candidate: candidate["confidence"])
+    
+    node.__name__ = f"{_fn_name(agent_fn)}_best_of_{n}"
+    return node
+
+def abest_of_n(aagent_fn, n: int = 3):
+    """best_of_n의 비동기 버전"""
+    async def node(state: CustomerState) -> CustomerState:
+        candidates = await asyncio.gather(*(aagent_fn(state) for _ in range(n)))
+        return max(candidates, key=lambda candidate: candidate["confidence"])
+    
+    node.__name__ = f"{_fn_name(aagent_fn)}_best_of_{n}"
+    return node
+
 # 테스트
 if __name__ == "__main__":
     # # 테스트 1: 기술 지원
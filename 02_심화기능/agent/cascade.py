@@ -0,0 +1,162 @@
+'''
+단계별(cascade) 문의 분류기
+ - 세 단어(technical/billing/general) 중 하나를 고르려고 매번 7B 모델을 돌리지 않도록
+   가벼운 방법부터 차례로 시도하고, 확신이 없을 때만 다음 단계로 넘김
+
+[분류 단계]
+1. rule   : 미리 컴파일한 키워드 정규식 => 한 카테고리만 걸리면 확정
+2. vector : 문자 n-gram 벡터와 카테고리별 예시 문장(prototype)의 코사인 유사도
+            => 1등 유사도가 충분하고 2등과의 차이(margin)가 크면 확정
+3. llm    : 위에서 결정되지 않은 문의만 LLM 분류
+
+ - 어떤 단계에서 결정됐는지(tier)를 함께 반환하고, 단계별 누적 횟수를 stats()로 확인
+'''
+import math
+import re
+import threading
+from collections import Counter
+from typing import Callable, Optional
+
+CATEGORIES = ["technical", "billing", "general"]
+
+# 1단계 : 키워드 규칙 (09_체크포인트_상태저장_MemorySavor.py 의 규칙을 확장)
+KEYWORD_RULES = {
+    "technical": ["로그인", "에러", "오류", "버그", "접속", "비밀번호", "설치", "업데이트", "앱이", "작동", "먹통", "튕"],
+    "billing": ["결제", "환불", "요금", "청구", "카드", "영수증", "구독", "해지", "과금", "입금", "결재"],
+}
+
+# 2단계 : 카테고리별 예시 문장
+PROTOTYPES = {
+    "technical": [
+        "로그인이 안돼요 에러 코드가 나와요",
+        "앱이 실행되지 않고 계속 종료됩니다",
+        "비밀번호를 바꿨는데 접속이 안됩니다",
+        "페이지가 열리지 않고 오류 메시지가 떠요",
+    ],
+    "billing": [
+        "카드 결제가 실패했습니다",
+        "환불은 언제 처리되나요",
+        "요금이 두 번 청구되었어요",
+        "구독을 해지하고 싶습니다",
+    ],
+    "general": [
+        "영업 시간이 어떻게 되나요",
+        "매장 위치를 알려주세요",
+        "상담원과 통화하고 싶어요",
+        "회원 혜택이 궁금합니다",
+    ],
+}
+
+
+def _ngrams(text: str, n_values=(2, 3)) -> Counter:
+    """공백을 제거한 문자 n-gram 빈도 (한국어는 형태소 분석 없이도 잘 동작)"""
+    text = re.sub(r"\s+", "", text.lower())
+    grams = Counter()
+    for n in n_values:
+        for i in range(len(text) - n + 1):
+            grams[text[i:i + n]] += 1
+    return grams
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(v * b.get(k, 0) for k, v in a.items())
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+class CascadeClassifier:
+    """rule → vector → llm 순서로 분류"""
+
+    def __init__(
+        self,
+        llm_fallback: Callable[[str], str],
+        min_similarity: float = 0.25,
+        margin: float = 0.08,
+        keyword_rules: dict = KEYWORD_RULES,
+        prototypes: dict = PROTOTYPES,
+    ):
+        self.llm_fallback = llm_fallback
+        self.min_similarity = min_similarity
+        self.margin = margin
+
+        # 키워드는 카테고리별 정규식 하나로 미리 컴파일
+        self._rules = {
+            category: re.compile("|".join(re.escape(word) for word in words))
+            for category, words in keyword_rules.items()
+        }
+        # 예시 문장은 카테고리별 n-gram 합으로 centroid 생성
+        self._prototypes = {}
+        for category, examples in prototypes.items():
+            centroid = Counter()
+            for example in examples:
+                centroid.update(_ngrams(example))
+            self._prototypes[category] = centroid
+
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def _by_rule(self, query: str) -> Optional[str]:
+        matched = [category for category, pattern in self._rules.items() if pattern.search(query)]
+        # 두 카테고리 이상 걸리면 애매하므로 다음 단계로
+        return matched[0] if len(matched) == 1 else None
+
+    def _by_vector(self, query: str) -> Optional[str]:
+        grams = _ngrams(query)
+        scores = sorted(
+            ((_cosine(grams, centroid), category) for category, centroid in self._prototypes.items()),
+            reverse=True,
+        )
+        (best, category), (second, _) = scores[0], scores[1]
+        if best >= self.min_similarity and best - second >= self.margin:
+            return category
+        return None
+
+    def _record(self, tier: str) -> None:
+        self.record(tier)
+
+    def record(self, tier: str, count: int = 1) -> None:
+        """classify를 거치지 않고 분류한 경우(배치 분류 등) 단계별 통계에 반영"""
+        if count:
+            with self._lock:
+                self._counts[tier] += count
+
+    def classify_fast(self, query: str) -> tuple:
+        """LLM 없이 분류 시도 => (category, tier), 결정 못하면 (None, None)"""
+        category = self._by_rule(query)
+        if category:
+            return category, "rule"
+        category = self._by_vector(query)
+        if category:
+            return category, "vector"
+        return None, None
+
+    def classify(self, query: str) -> tuple:
+        """(category, tier) 반환"""
+        category, tier = self.classify_fast(query)
+        if category is None:
+            category, tier = self.llm_fallback(query), "llm"
+        self._record(tier)
+        return category, tier
+
+    async def aclassify(self, query: str, allm_fallback) -> tuple:
+        """classify의 비동기 버전 (LLM 단계만 await)"""
+        category, tier = self.classify_fast(query)
+        if category is None:
+            category, tier = await allm_fallback(query), "llm"
+        self._record(tier)
+        return category, tier
+
+    def stats(self) -> dict:
+        """단계별 결정 횟수와 LLM까지 내려간 비율"""
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        return {
+            **{tier: counts.get(tier, 0) for tier in ("rule", "vector", "llm")},
+            "total": total,
+            "llm_fallthrough_rate": counts.get("llm", 0) / total if total else 0.0,
+        }
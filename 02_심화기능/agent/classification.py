@@ -1,25 +1,20 @@
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_ollama import ChatOllama
 from typing import TypedDict, Literal
+import re
+from agent.llm_pool import get_llm
+from agent.llm_cache import node_cache
+from agent.cascade import CascadeClassifier
 
 class CustomerState(TypedDict):
     query: str
     category: str
     response: str
     confidence: float
+    classified_by: str # 분류를 결정한 단계 (rule / vector / llm)
 
 
 
-def classify_agent(state: CustomerState) -> CustomerState:
-    """고객 문의를 분류하는 에이전트"""
-    # llm 설정
-    llm = ChatOllama(
-            model="devna0111-7b-q4",
-            base_url="http://localhost:11434",
-            temperature=0.15,
-        )
-    
-    system_prompt = """당신은 고객 문의 분류 전문가입니다.
+CLASSIFY_PROMPT = """당신은 고객 문의 분류 전문가입니다.
                         문의를 다음 카테고리로 분류하세요:
                         - technical: 기술적 문제, 버그, 오류
                         - billing: 결제, 환불, 요금
@@ -27,23 +22,161 @@ def classify_agent(state: CustomerState) -> CustomerState:
 
                         반드시 한 단어로만 답변하세요: technical, billing, general 중 하나"""
 
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=f"문의 내용: {state['query']}")
+def _classify_messages(query: str) -> list:
+    return [
+        SystemMessage(content=CLASSIFY_PROMPT),
+        HumanMessage(content=f"문의 내용: {query}")
     ]
-    
-    response = llm.invoke(messages)
-    category = response.content.strip().lower()
+
+CATEGORIES = ["technical", "billing", "general"]
+
+def _parse_category(text: str) -> str:
+    category = text.strip().lower()
     
     # 유효성 검사
-    if category not in ["technical", "billing", "general"]:
+    if category not in CATEGORIES:
         category = "general"
+    return category
+
+def classify_agent(state: CustomerState) -> CustomerState:
+    """고객 문의를 분류하는 에이전트"""
+    # llm 설정 (공유 클라이언트)
+    llm = get_llm(temperature=0.15, cache=node_cache("classify"))
+    
+    response = llm.invoke(_classify_messages(state['query']))
+    category = _parse_category(response.content)
     
     return {
         **state,
         "category": category, # state 전체를 언패킹 후 category와 confidence만 업데이트
         "confidence": 0.9  # 향후 평가LLM을 추가해서 LLM 응답에서 추출
     }
+
+def _llm_classify(query: str) -> str:
+    llm = get_llm(temperature=0.15, cache=node_cache("classify"))
+    return _parse_category(llm.invoke(_classify_messages(query)).content)
+
+async def _allm_classify(query: str) -> str:
+    llm = get_llm(temperature=0.15, cache=node_cache("classify"))
+    return _parse_category((await llm.ainvoke(_classify_messages(query))).content)
+
+# 키워드 → 유사도 → LLM 순서로 분류 (공유 인스턴스 : 단계별 통계 누적)
+cascade = CascadeClassifier(llm_fallback=_llm_classify)
+
+def cascade_classify_agent(state: CustomerState) -> CustomerState:
+    """키워드/유사도로 먼저 분류하고 애매한 문의만 LLM으로 분류"""
+    category, tier = cascade.classify(state['query'])
+    
+    return {
+        **state,
+        "category": category,
+        "classified_by": tier,
+        "confidence": 0.9
+    }
+
+async def acascade_classify_agent(state: CustomerState) -> CustomerState:
+    """cascade_classify_agent의 비동기 버전"""
+    category, tier = await cascade.aclassify(state['query'], _allm_classify)
+    
+    return {
+        **state,
+        "category": category,
+        "classified_by": tier,
+        "confidence": 0.9
+    }
+
+BATCH_PROMPT = """당신은 고객 문의 분류 전문가입니다.
+                    번호가 붙은 각 문의를 다음 카테고리로 분류하세요:
+                    - technical: 기술적 문제, 버그, 오류
+                    - billing: 결제, 환불, 요금
+                    - general: 일반 문의, 기타
+
+                    각 줄에 "번호: 카테고리" 형식으로만 답변하세요. 예) 1: billing"""
+
+_BATCH_LINE = re.compile(r'^\s*(\d+)\s*[.:)\-]\s*(technical|billing|general)\b', re.MULTILINE | re.IGNORECASE)
+
+def _batch_messages(queries: list) -> list:
+    numbered = "\n".join(f"{i}. {' '.join(query.split())}" for i, query in enumerate(queries, 1))
+    return [
+        SystemMessage(content=BATCH_PROMPT),
+        HumanMessage(content=f"문의 목록:\n{numbered}")
+    ]
+
+def _parse_batch(text: str, size: int) -> list:
+    """"번호: 카테고리" 줄을 파싱, 빠지거나 잘못된 번호는 None"""
+    labels = [None] * size
+    for number, category in _BATCH_LINE.findall(text):
+        index = int(number) - 1
+        if 0 <= index < size and labels[index] is None:
+            labels[index] = category.lower()
+    return labels
+
+def classify_batch(queries: list, mode: str = "packed", chunk_size: int = 20,
+                   max_concurrency: int = 8, use_cascade: bool = True) -> list:
+    """여러 문의를 한 번에 분류 => 입력 순서대로 카테고리 리스트 반환
+    mode
+     - "packed"     : chunk_size개씩 번호를 붙여 한 프롬프트로 분류 (Ollama 등 단일 요청 처리 백엔드)
+     - "concurrent" : 문의마다 요청을 만들어 동시에 전송 (vLLM처럼 서버에서 배치 처리하는 백엔드)
+    use_cascade : 키워드/유사도 단계로 결정되는 문의는 LLM에 보내지 않음"""
+    labels = [None] * len(queries)
+    if use_cascade:
+        for i, query in enumerate(queries):
+            labels[i], tier = cascade.classify_fast(query)
+            if tier:
+                cascade.record(tier)
+    pending = [i for i, label in enumerate(labels) if label is None]
+    # 키워드/유사도로 결정하지 못한 문의는 LLM 단계로 집계 (cascade.stats의 llm_fallthrough_rate)
+    cascade.record("llm", len(pending))
+    if not pending:
+        return labels
+
+    llm = get_llm(temperature=0.15, cache=node_cache("classify"))
+    config = {"max_concurrency": max_concurrency}
+
+    def classify_each(indices: list) -> list:
+        """문의별 단일 프롬프트를 동시에 전송, 호출 자체가 실패한 행만 다시 반환
+        응답은 받았지만 라벨이 잘못된 행은 같은 프롬프트를 다시 보내도 결과가 같으므로 바로 general"""
+        responses = llm.batch([_classify_messages(queries[i]) for i in indices], config=config, return_exceptions=True)
+        errors = []
+        for i, response in zip(indices, responses):
+            if isinstance(response, Exception):
+                errors.append(i)
+            else:
+                labels[i] = _parse_category(response.content)
+        return errors
+
+    if mode == "concurrent":
+        failed = classify_each(pending)
+    else:
+        chunks = [pending[start:start + chunk_size] for start in range(0, len(pending), chunk_size)]
+        responses = llm.batch([_batch_messages([queries[i] for i in chunk]) for chunk in chunks], config=config, return_exceptions=True)
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, Exception):
+                continue
+            for i, category in zip(chunk, _parse_batch(response.content, len(chunk))):
+                labels[i] = category
+        failed = [i for i in pending if labels[i] is None]
+
+    # 호출이 실패했거나(concurrent) 배치 응답에서 빠진 행(packed)만 같은 동시성으로 한 번 더 분류
+    if failed:
+        print(f"배치 분류 실패 {len(failed)}건 => 문의별 프롬프트로 재분류")
+        failed = classify_each(failed)
+    for i in failed:
+        labels[i] = "general"
+    return labels
+
+async def aclassify_agent(state: CustomerState) -> CustomerState:
+    """classify_agent의 비동기 버전"""
+    llm = get_llm(temperature=0.15, cache=node_cache("classify"))
+    
+    response = await llm.ainvoke(_classify_messages(state['query']))
+    category = _parse_category(response.content)
+    
+    return {
+        **state,
+        "category": category,
+        "confidence": 0.9
+    }
     
 if __name__ == "__main__":
     # 테스트 1: 기술 문의
@@ -83,4 +216,8 @@ if __name__ == "__main__":
     result3 = classify_agent(test_state3)
     print(f"문의: {result3['query']}")
     print(f"분류: {result3['category']}")
-    print(f"신뢰도: {result3['confidence']}")
\ No newline at end of file
+    print(f"신뢰도: {result3['confidence']}")
+
+    # 테스트 4: 배치 분류
+    queries = [test_state1["query"], test_state2["query"], test_state3["query"], "앱 업데이트 후 화면이 하얗게 나와요"]
+    print(f"\n배치 분류: {classify_batch(queries)}")
@@ -0,0 +1,152 @@
+'''
+병렬 분기(fan-out) 실행기
+ - 백엔드별 동시 실행 수 제한 (백엔드마다 크기가 정해진 스레드 풀)
+ - 분기별 제한 시간(timeout) : 풀에서 실제로 실행을 시작한 시점부터 계산
+   (동시 실행 수보다 분기가 많아 큐에서 기다린 시간은 제외, queue_timeout으로 따로 제한 가능)
+ - 제한 시간을 넘긴 분기 처리 정책
+    drop        : 결과 없이 진행 (None)
+    placeholder : 대체 문구로 진행
+    wait        : 끝날 때까지 기다림 (상태는 late로 표시)
+
+ # 사용
+    runner = BranchRunner(max_concurrency={"ollama": 2}, timeout=30, late_policy="placeholder")
+    result, status = runner.run("web", llm.invoke, messages, backend="ollama")
+    print(runner.stats())                               # 분기별 큐 대기 / 실행 시간
+    pooled = PooledLLM(llm, runner, backend="ollama")   # 분기 밖의 LLM 호출도 같은 동시성 제한 안에서 실행
+'''
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Optional, Union
+
+LATE_POLICIES = ("drop", "placeholder", "wait")
+PLACEHOLDER = "(제한 시간 내에 결과를 받지 못했습니다)"
+
+
+class BranchRunner:
+    """백엔드별 동시성 제한 + 분기별 timeout"""
+
+    def __init__(
+        self,
+        max_concurrency: Union[int, dict] = 4,
+        timeout: Optional[float] = 30.0,
+        late_policy: str = "placeholder",
+        placeholder: str = PLACEHOLDER,
+        queue_timeout: Optional[float] = None,
+    ):
+        if late_policy not in LATE_POLICIES:
+            raise ValueError(f"late_policy는 {LATE_POLICIES} 중 하나여야 합니다: {late_policy}")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.late_policy = late_policy
+        self.placeholder = placeholder
+        self.queue_timeout = queue_timeout  # 풀에서 실행을 기다리는 최대 시간 (None이면 무제한)
+        self._executors: dict = {}
+        self._lock = threading.Lock()
+        self._timings: dict = {}  # 분기 이름 -> 마지막 실행의 큐 대기 / 실행 시간(초)
+
+    def _limit(self, backend: str) -> int:
+        if isinstance(self.max_concurrency, dict):
+            return self.max_concurrency.get(backend, self.max_concurrency.get("default", 4))
+        return self.max_concurrency
+
+    def _executor(self, backend: str) -> ThreadPoolExecutor:
+        with self._lock:
+            executor = self._executors.get(backend)
+            if executor is None:
+                # 풀 크기 = 해당 백엔드 최대 동시 실행 수 (초과 요청은 큐에서 대기)
+                executor = ThreadPoolExecutor(max_workers=self._limit(backend), thread_name_prefix=f"branch-{backend}")
+                self._executors[backend] = executor
+            return executor
+
+    def submit(self, fn: Callable, *args, backend: str = "default", **kwargs) -> Future:
+        """제한 시간 없이 백엔드 풀에 작업만 넣음 (분기 외 후처리 호출용)"""
+        return self._executor(backend).submit(fn, *args, **kwargs)
+
+    def run(self, branch: str, fn: Callable, *args, backend: str = "default",
+            timeout: Optional[float] = None, late_policy: Optional[str] = None, **kwargs) -> tuple:
+        """fn(*args, **kwargs)를 실행 => (결과, 상태) 반환
+        상태 : ok / late / timeout / error"""
+        timeout = self.timeout if timeout is None else timeout
+        late_policy = late_policy or self.late_policy
+        fallback = self.placeholder if late_policy == "placeholder" else None
+
+        started = threading.Event()
+        start_time = []
+
+        def call():
+            start_time.append(time.monotonic())
+            started.set()
+            return fn(*args, **kwargs)
+
+        submitted = time.monotonic()
+        future = self._executor(backend).submit(call)
+
+        # 1. 풀 자리가 날 때까지 대기 (제한 시간에 포함하지 않음)
+        while not started.wait(0.05):
+            if future.done():
+                break  # 실행 전에 취소됨 (shutdown)
+            if self.queue_timeout is not None and time.monotonic() - submitted > self.queue_timeout and future.cancel():
+                self._record(branch, time.monotonic() - submitted, 0.0)
+                print(f"[{branch}] 큐 대기 {self.queue_timeout}초 초과 => 실행하지 않음")
+                return fallback, "timeout"
+        if not start_time:
+            print(f"[{branch}] 실행 전에 취소됨")
+            return fallback, "error"
+        queued = start_time[0] - submitted
+        if queued >= 1.0:
+            print(f"[{branch}] 큐 대기 {queued:.1f}초 후 실행 시작")
+
+        # 2. 실행 시작 시점부터 timeout
+        remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - start_time[0]))
+        try:
+            result = future.result(timeout=remaining)
+            self._record(branch, queued, time.monotonic() - start_time[0])
+            return result, "ok"
+        except FutureTimeout:
+            self._record(branch, queued, time.monotonic() - start_time[0])
+            print(f"[{branch}] {timeout}초 초과 => {late_policy}")
+            if late_policy == "wait":
+                try:
+                    return future.result(), "late"
+                except Exception as e:
+                    print(f"[{branch}] 실패: {e}")
+                    return None, "error"
+            # 이미 실행 중인 요청은 취소할 수 없으므로 백그라운드에서 끝나도록 두고 결과만 버림
+            return fallback, "timeout"
+        except Exception as e:
+            self._record(branch, queued, time.monotonic() - start_time[0])
+            print(f"[{branch}] 실패: {e}")
+            return fallback, "error"
+
+    def _record(self, branch: str, queued: float, ran: float) -> None:
+        with self._lock:
+            self._timings[branch] = {"queued": queued, "ran": ran}
+
+    def stats(self) -> dict:
+        """분기별 마지막 실행의 큐 대기 시간과 실행 시간(초)"""
+        with self._lock:
+            return {branch: dict(timing) for branch, timing in self._timings.items()}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for executor in self._executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+            self._executors.clear()
+
+
+class PooledLLM:
+    """llm.invoke / llm.batch 를 BranchRunner의 백엔드 풀에서 실행하는 래퍼"""
+
+    def __init__(self, llm, runner: BranchRunner, backend: str = "default"):
+        self.llm = llm
+        self.runner = runner
+        self.backend = backend
+
+    def invoke(self, messages, **kwargs):
+        return self.runner.submit(self.llm.invoke, messages, backend=self.backend, **kwargs).result()
+
+    def batch(self, inputs: list, config=None) -> list:
+        # 동시 실행 수는 풀 크기로 제한되므로 config의 max_concurrency는 사용하지 않음
+        futures = [self.runner.submit(self.llm.invoke, messages, backend=self.backend) for messages in inputs]
+        return [future.result() for future in futures]
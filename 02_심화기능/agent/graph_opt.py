@@ -0,0 +1,40 @@
+'''
+그래프 컴파일 전 최적화 : 순수 함수 라우터 노드 합치기(fusion)
+ - manager_node처럼 상태만 보고 다음 worker를 정하는 노드도 하나의 노드이므로
+   거칠 때마다 superstep 1회 + (체크포인터 사용 시) 체크포인트 저장 1회가 발생
+ - 부수효과 없는 라우터는 노드로 두지 않고, 앞 노드의 조건부 엣지 안에서 바로 계산하면
+   Manager → Researcher → Manager → ... 가 Researcher → Analyzer → Writer 로 줄어듦
+
+ # 사용
+    add_fused_router(workflow, router=decide_next, route=route_to_worker,
+                     path_map={...}, sources=["researcher", "analyzer"], entry=True)
+'''
+from typing import Callable
+
+from langgraph.graph import StateGraph
+
+
+def fuse(router: Callable[[dict], dict], route: Callable[[dict], str]) -> Callable[[dict], str]:
+    """router(state)가 돌려줄 업데이트를 상태에 적용한 것처럼 route를 바로 계산
+    router는 반드시 상태를 읽기만 하는 순수 함수여야 함"""
+    def fused_route(state: dict) -> str:
+        return route({**state, **router(state)})
+
+    fused_route.__name__ = f"{getattr(router, '__name__', 'router')}_{getattr(route, '__name__', 'route')}"
+    return fused_route
+
+
+def add_fused_router(
+    workflow: StateGraph,
+    router: Callable[[dict], dict],
+    route: Callable[[dict], str],
+    path_map: dict,
+    sources: list,
+    entry: bool = False,
+) -> None:
+    """라우터 노드를 추가하는 대신 sources(와 시작점)의 조건부 엣지로 인라인"""
+    fused_route = fuse(router, route)
+    if entry:
+        workflow.set_conditional_entry_point(fused_route, path_map)
+    for source in sources:
+        workflow.add_conditional_edges(source, fused_route, path_map)
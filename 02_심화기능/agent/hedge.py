@@ -0,0 +1,124 @@
+'''
+헤지 요청(hedged request) : 느린 분기(straggler) 대응
+ - 최근 응답 시간 분포에서 p95 같은 기준 시간을 학습
+ - 요청이 기준 시간을 넘기면 다른 백엔드/레플리카에 같은 요청을 한 번 더 보내고 먼저 끝난 결과 사용
+ - 헤지 비율 상한(budget)을 두어 전체 부하가 두 배가 되지 않도록 제한
+ - 평균이 아니라 꼬리 지연(p99 등)을 줄이기 위한 기법
+
+ # 사용
+    hedged = HedgedCaller([primary_llm, replica_llm], percentile=0.95, budget=0.1)
+    result = hedged.invoke(messages)
+    print(hedged.stats())
+'''
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional
+
+
+class LatencyTracker:
+    """최근 N개 응답 시간으로 백분위수 계산"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """표본이 부족하면 None (아직 헤지 기준을 정할 수 없음)"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class HedgedCaller:
+    """backends[0]으로 먼저 요청하고, 기준 시간을 넘기면 다음 백엔드로 헤지"""
+
+    def __init__(self, backends: list, percentile: float = 0.95, budget: float = 0.1,
+                 window: int = 200, min_samples: int = 20, max_workers: int = 16):
+        self.backends = backends
+        self.percentile = percentile
+        self.budget = budget  # 전체 요청 대비 헤지 요청 최대 비율
+        self.tracker = LatencyTracker(window=window, min_samples=min_samples)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self._next_replica = 0
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _timed(self, backend, *args, **kwargs) -> tuple:
+        start = time.perf_counter()
+        result = backend.invoke(*args, **kwargs)
+        return result, time.perf_counter() - start
+
+    def _try_hedge(self):
+        """예산 안이면 헤지할 레플리카 반환"""
+        with self._lock:
+            if len(self.backends) < 2 or self.hedges + 1 > self.budget * self.requests:
+                return None
+            self.hedges += 1
+            replica = self.backends[1 + self._next_replica % (len(self.backends) - 1)]
+            self._next_replica += 1
+            return replica
+
+    def invoke(self, *args, **kwargs):
+        with self._lock:
+            self.requests += 1
+        delay = self.tracker.percentile(self.percentile)
+
+        primary = self._executor.submit(self._timed, self.backends[0], *args, **kwargs)
+        if delay is None or len(self.backends) < 2:
+            result, elapsed = primary.result()
+            self.tracker.record(elapsed)
+            return result
+
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            result, elapsed = primary.result()
+            self.tracker.record(elapsed)
+            return result
+
+        replica = self._try_hedge()
+        if replica is None:
+            result, elapsed = primary.result()
+            self.tracker.record(elapsed)
+            return result
+
+        print(f"[Hedge] {delay:.1f}초 초과 => 레플리카로 중복 요청")
+        hedge = self._executor.submit(self._timed, replica, *args, **kwargs)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result, elapsed = future.result()
+                except Exception as e:
+                    error = e  # 한쪽이 실패하면 나머지 결과를 기다림
+                    continue
+                if future is hedge:
+                    with self._lock:
+                        self.hedge_wins += 1
+                    # 헤지 요청은 기준 시간 이후 시작했으므로 전체 대기 시간으로 기록
+                    elapsed += delay
+                self.tracker.record(elapsed)
+                return result
+        raise error
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+            f"p{int(self.percentile * 100)}": self.tracker.percentile(self.percentile),
+        }
@@ -0,0 +1,104 @@
+'''
+점진적(incremental) 결과 통합
+ - 기존 aggregator는 모든 분기가 끝날 때까지 기다렸다가 결과 전체를 한 번에 통합
+ - 여기서는 분기 결과가 도착할 때마다 진행 중 요약(running synthesis)에 바로 접어넣음(fold)
+    첫 번째 결과 : LLM 호출 없이 그대로 보관 (staging)
+    중간 결과    : 백그라운드에서 기존 요약 + 새 결과를 병합 (아직 조사 중인 분기와 겹쳐 실행)
+    마지막 결과  : 최종 보고서 작성 시 요약 + 마지막 결과만 합치면 됨
+ - 병합은 전용 스레드 하나에서 도착 순서대로 실행되므로 요약이 꼬이지 않음
+ - 병합/최종 프롬프트에 넣기 전에 fit_to_context로 컨텍스트 한도 안으로 줄임 (reduce.py)
+ - 분기와 같은 동시성 제한을 받으려면 llm 대신 PooledLLM(llm, runner)을 전달 (fanout.py)
+
+ # 사용
+    aggregator = IncrementalAggregator(PooledLLM(llm, runner, "ollama"), topic, expected=3)
+    aggregator.add("웹 조사 결과", content)       # 각 분기 완료 시
+    report = aggregator.finish()                 # 모든 분기 완료 후
+    aggregator.close()                           # 실행이 중간에 실패한 경우에도 호출
+'''
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+
+from agent.reduce import fit_to_context
+
+FOLD_PROMPT = """주제 '{topic}'에 대한 조사 내용을 정리하고 있습니다.
+지금까지 정리된 내용에 새 조사 결과를 합쳐 하나의 정리본으로 다시 작성하세요.
+중복은 제거하고 출처 구분(웹/DB/API 등)은 유지하세요.
+
+[지금까지 정리된 내용]
+{synthesis}
+
+[새 조사 결과]
+{new_result}"""
+
+FINAL_PROMPT = """다음 조사 결과를 통합하여 종합 보고서를 작성하세요.
+
+주제: {topic}
+
+{results}
+{note}
+위 내용을 간단히 통합하여 보고서를 작성하세요."""
+
+
+class IncrementalAggregator:
+    """분기 결과가 도착하는 즉시 요약에 병합하는 통합기"""
+
+    def __init__(self, llm, topic: str, expected: int):
+        self.llm = llm
+        self.topic = topic
+        self.expected = expected
+
+        self._synthesis = ""
+        self._last = None          # 마지막으로 도착한 결과 (최종 단계에서 병합)
+        self._missing = []
+        self._received = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fold")
+        self._futures = []
+
+    def _fold(self, label: str, content: str) -> None:
+        section = f"{label}:\n{content}"
+        if not self._synthesis:
+            self._synthesis = section  # 첫 결과는 보관만
+            return
+        parts = fit_to_context([self._synthesis, section], self.llm)
+        if parts != [self._synthesis, section]:
+            # 한도를 넘어 이미 요약/절단됨 => 그 결과를 새 정리본으로 사용
+            self._synthesis = "\n\n".join(parts)
+        else:
+            prompt = FOLD_PROMPT.format(topic=self.topic, synthesis=self._synthesis, new_result=section)
+            self._synthesis = self.llm.invoke([HumanMessage(content=prompt)]).content
+        print(f"[Incremental] '{label}' 병합 완료")
+
+    def add(self, label: str, content: str, ok: bool = True) -> None:
+        """분기 하나의 결과 도착 (ok=False면 누락으로 기록)"""
+        with self._lock:
+            self._received += 1
+            is_last = self._received >= self.expected
+            if not ok or not content:
+                self._missing.append(label)
+            elif is_last:
+                self._last = (label, content)  # 마지막 결과는 최종 보고서에서 바로 사용
+            else:
+                self._futures.append(self._executor.submit(self._fold, label, content))
+
+    def finish(self) -> str:
+        """진행 중인 병합을 기다린 뒤 마지막 결과만 합쳐 최종 보고서 작성"""
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            self.close()
+
+        sections = [f"[정리된 조사 내용]\n{self._synthesis or '(없음)'}"]
+        if self._last:
+            sections.append(f"[{self._last[0]}]\n{self._last[1]}")
+        results = "\n\n".join(fit_to_context(sections, self.llm))
+        note = f"\n(다음 조사는 제한 시간 내에 완료되지 않아 제외되었습니다: {', '.join(self._missing)})\n" if self._missing else ""
+        prompt = FINAL_PROMPT.format(topic=self.topic, results=results, note=note)
+        return self.llm.invoke([HumanMessage(content=prompt)]).content
+
+    def close(self) -> None:
+        """대기 중인 병합을 취소하고 병합 스레드 정리"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
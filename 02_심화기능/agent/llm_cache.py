@@ -0,0 +1,190 @@
+'''
+LLM 응답 캐시 (메모리 LRU + SQLite 디스크 2단계)
+ - 분류(temperature 0.15), 신뢰도 평가(temperature 0.1)처럼 결정적에 가까운 호출은
+   같은 질문이면 같은 답이 나오므로 GPU를 다시 쓰지 않고 캐시에서 반환
+ - 키 : (모델 + 샘플링 파라미터, 공백 정규화된 메시지) => LangChain의 llm_string / prompt
+ - 노드 단위로 opt-in : enable_cache("classify", "evaluate") 로 켠 노드만 캐시 사용
+
+ # 사용
+    from agent.llm_cache import enable_cache, node_cache, cache_stats
+    enable_cache("classify")
+    llm = get_llm(temperature=0.15, cache=node_cache("classify"))
+'''
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+
+DEFAULT_DB_PATH = "db/llm_cache.db"
+
+
+class TieredLLMCache(BaseCache):
+    """메모리 LRU → SQLite 순서로 조회하는 LangChain 캐시"""
+
+    def __init__(
+        self,
+        db_path: str = DEFAULT_DB_PATH,
+        max_memory_items: int = 1024,
+        max_disk_items: int = 100_000,
+        ttl_seconds: float = 24 * 60 * 60,
+    ):
+        self.db_path = db_path
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes_since_prune = 0
+
+        # 히트/미스 카운터
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # 키 생성
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        # 프롬프트 들여쓰기/줄바꿈 차이는 같은 질문으로 취급
+        normalized = re.sub(r"\s+", " ", prompt).strip()
+        return hashlib.sha256(f"{llm_string}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.db_path):
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache (created_at);
+            """)
+        return self._conn
+
+    def _remember(self, key: str, value: RETURN_VAL_TYPE, created_at: float) -> None:
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)  # 가장 오래 안 쓴 항목 제거
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        now = time.time()
+
+        with self._lock:
+            # 1단계 : 메모리
+            item = self._memory.get(key)
+            if item is not None:
+                value, created_at = item
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            # 2단계 : 디스크
+            row = self._db().execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] <= self.ttl_seconds:
+                value = loads(row[0])
+                self._remember(key, value, row[1])
+                self.disk_hits += 1
+                return value
+
+            self.misses += 1
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self._key(prompt, llm_string)
+        now = time.time()
+
+        with self._lock:
+            self._remember(key, return_val, now)
+            conn = self._db()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, dumps(return_val), now),
+            )
+            conn.commit()
+
+            # 매번 정리하면 느리므로 일정 횟수마다 만료/용량 초과분 삭제
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= 100:
+                self._prune(now)
+                self._writes_since_prune = 0
+
+    def _prune(self, now: float) -> None:
+        conn = self._db()
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            """DELETE FROM llm_cache WHERE key IN (
+                   SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+               )""",
+            (self.max_disk_items,),
+        )
+        conn.commit()
+
+    def clear(self, **kwargs) -> None:
+        with self._lock:
+            self._memory.clear()
+            conn = self._db()
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+    def stats(self) -> dict:
+        """히트/미스 카운터"""
+        total = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / total if total else 0.0,
+            "memory_items": len(self._memory),
+        }
+
+
+# 노드별 opt-in 설정
+_enabled_nodes: set = set()
+_shared_cache: Optional[TieredLLMCache] = None
+_shared_lock = threading.Lock()
+
+
+def enable_cache(*nodes: str) -> None:
+    """지정한 노드에서 캐시 사용"""
+    _enabled_nodes.update(nodes)
+
+
+def disable_cache(*nodes: str) -> None:
+    _enabled_nodes.difference_update(nodes)
+
+
+def node_cache(node: str) -> Optional[TieredLLMCache]:
+    """캐시가 켜진 노드면 공유 캐시, 아니면 None"""
+    global _shared_cache
+    if node not in _enabled_nodes:
+        return None
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = TieredLLMCache()
+    return _shared_cache
+
+
+def cache_stats() -> dict:
+    """공유 캐시의 히트/미스 통계"""
+    if _shared_cache is None:
+        return {}
+    return _shared_cache.stats()
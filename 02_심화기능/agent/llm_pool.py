@@ -0,0 +1,64 @@
+'''
+프로세스 전역 LLM 클라이언트 레지스트리
+ - get_llm()을 호출할 때마다 ChatOllama(+ 내부 HTTP 클라이언트)를 새로 만들지 않고
+   (model, base_url, temperature) 조합별로 한 번만 생성해서 재사용
+ - ChatOllama 내부 httpx 클라이언트에 keep-alive 커넥션 풀을 설정하여
+   노드를 이동할 때마다 TCP 연결을 새로 맺는 비용을 없앰
+
+ # 사용
+    from agent.llm_pool import get_llm
+    llm = get_llm(temperature=0.1)   # 같은 조합이면 항상 같은 객체 반환
+'''
+import threading
+
+import httpx
+from langchain_ollama import ChatOllama
+
+DEFAULT_MODEL = "devna0111-7b-q4"
+DEFAULT_BASE_URL = "http://localhost:11434"
+
+# 커넥션 풀 설정 (노드 수 x 동시 요청 수 정도면 충분)
+POOL_LIMITS = httpx.Limits(
+    max_connections=64,
+    max_keepalive_connections=32,
+    keepalive_expiry=60.0,  # 유휴 연결 유지 시간(초)
+)
+POOL_TIMEOUT = httpx.Timeout(120.0, connect=5.0)
+
+_registry: dict = {}
+_lock = threading.Lock()
+
+
+def get_llm(model: str = DEFAULT_MODEL, temperature: float = 0.7, base_url: str = DEFAULT_BASE_URL, **kwargs) -> ChatOllama:
+    """(model, base_url, temperature) 별로 공유되는 ChatOllama 반환"""
+    kwargs = {k: v for k, v in kwargs.items() if v is not None}
+    key = (model, base_url, float(temperature), tuple(sorted(kwargs.items())))
+
+    llm = _registry.get(key)
+    if llm is not None:
+        return llm
+
+    with _lock:
+        # 다른 스레드가 먼저 만들었을 수 있으므로 한 번 더 확인
+        llm = _registry.get(key)
+        if llm is None:
+            llm = ChatOllama(
+                model=model,
+                base_url=base_url,
+                temperature=temperature,
+                client_kwargs={"limits": POOL_LIMITS, "timeout": POOL_TIMEOUT},
+                **kwargs,
+            )
+            _registry[key] = llm
+    return llm
+
+
+def pool_size() -> int:
+    """현재 레지스트리에 등록된 클라이언트 수"""
+    return len(_registry)
+
+
+def clear_pool() -> None:
+    """레지스트리 초기화 (테스트/설정 변경 시)"""
+    with _lock:
+        _registry.clear()
@@ -0,0 +1,68 @@
+'''
+스트리밍 파이프라인 : 앞 단계가 생성 중일 때 뒤 단계를 미리 시작 (speculative start)
+ - researcher가 토큰을 스트리밍하는 동안 완성된 문장/불릿(안정된 prefix)을 잘라내어
+   analyzer가 바로 부분 분석을 시작
+ - 조사가 끝나는 시점에는 마지막 조각(min_chars 이하)의 분석만 남으므로
+   조사 이후 지연이 전체 분석 1회에서 짧은 조각 분석 1회로 줄어듦
+ - 부분 분석은 조각만 보고 작성되므로 다음 단계(예: writer)가 전체 결과와 함께 받아 종합해야 함
+   (부분 분석을 다시 LLM으로 통합하면 그 호출이 조사 이후에 남아 이득이 사라짐)
+ - 백엔드가 동시 요청을 처리할 수 있어야 효과가 있음 (Ollama : OLLAMA_NUM_PARALLEL, vLLM : 기본 지원)
+
+ # 사용
+    chunks = (chunk.content for chunk in llm.stream(messages))
+    research, partials = pipelined_stage(chunks, analyze_fn)
+'''
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+# 줄바꿈(불릿 끝) 또는 문장 부호 뒤 공백을 경계로 봄
+_BOUNDARY = re.compile(r'\n|(?<=[.!?。])\s')
+
+
+def stable_segments(chunks: Iterable[str]) -> Iterator[str]:
+    """스트리밍 조각을 받아 완성된 문장/줄 단위로 반환 (더 이상 바뀌지 않는 부분만)
+    공백/줄바꿈을 그대로 유지하므로 이어붙이면 원문과 같음"""
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            match = _BOUNDARY.search(buffer)
+            if not match:
+                break
+            segment, buffer = buffer[:match.end()], buffer[match.end():]
+            yield segment
+    if buffer:
+        yield buffer
+
+
+def pipelined_stage(
+    chunks: Iterable[str],
+    analyze: Callable[[str], str],
+    min_chars: int = 200,
+    max_workers: int = 2,
+    on_segment: Callable[[str], None] = None,
+) -> tuple:
+    """상위 단계 스트림을 소비하면서 min_chars 이상 모일 때마다 analyze를 백그라운드 실행
+    => (전체 상위 결과, 부분 분석 리스트) 반환"""
+    full_text = []
+    batch, batch_chars = [], 0
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative") as executor:
+        for segment in stable_segments(chunks):
+            if on_segment:
+                on_segment(segment)
+            full_text.append(segment)
+            batch.append(segment)
+            batch_chars += len(segment.strip())
+            if batch_chars >= min_chars:
+                futures.append(executor.submit(analyze, "".join(batch).strip()))
+                batch, batch_chars = [], 0
+
+        # 마지막 남은 조각만 스트림 종료 후 분석
+        if batch_chars:
+            futures.append(executor.submit(analyze, "".join(batch).strip()))
+        partials = [future.result() for future in futures]
+
+    return "".join(full_text), partials
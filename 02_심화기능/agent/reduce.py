@@ -0,0 +1,121 @@
+'''
+토큰 한도를 고려한 계층형 map-reduce 요약
+ - aggregator/writer가 상위 결과를 프롬프트 하나에 그대로 붙이면
+   모델 컨텍스트(03_vLLM서버설정.py 의 max-model-len 4096)를 넘어 실패하거나 품질이 떨어짐
+ - 한도를 넘으면 결과들을 한도 안에 들어가는 묶음(chunk)으로 나눠 병렬 요약하고,
+   요약본끼리 다시 묶어 요약하는 과정을 들어갈 때까지 반복 (트리 형태 병합)
+ - 묶음 하나에 여러 결과가 들어가므로 단계 수는 분기 수에 대해 로그로 증가
+
+ # 사용
+    sections = fit_to_context(["웹 조사 결과:\\n...", "DB 조사 결과:\\n..."], llm)
+    prompt = "\\n\\n".join(sections)
+'''
+from typing import Callable
+
+CONTEXT_WINDOW = 4096     # 모델 최대 컨텍스트 (max-model-len)
+OUTPUT_RESERVE = 1024     # 답변 생성을 위해 남겨둘 토큰
+PROMPT_OVERHEAD = 300     # 지시문/주제 등 본문 외 프롬프트 토큰
+
+SUMMARY_PROMPT = """다음 조사 내용을 핵심 사실과 수치 위주로 간결하게 요약하세요.
+중복되는 내용은 한 번만 쓰고, 출처 구분(웹/DB/API 등)은 유지하세요.
+
+{content}"""
+
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 보수적으로 토큰 수 추정
+    한글 등 비ASCII 문자는 1글자당 1토큰, ASCII는 4글자당 1토큰으로 계산"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii) // 4 + 1
+
+
+def _split_text(text: str, budget: int, count: Callable[[str], int]) -> list:
+    """한 덩어리가 budget보다 크면 줄 단위로 잘라 budget 이하 조각으로 분할"""
+    pieces, current = [], ""
+    for line in text.splitlines(keepends=True):
+        # 한 줄이 너무 길면 글자 단위로 자름
+        while count(line) > budget:
+            cut = max(1, len(line) * budget // count(line))
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:cut])
+            line = line[cut:]
+        if current and count(current + line) > budget:
+            pieces.append(current)
+            current = ""
+        current += line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _pack(texts: list, budget: int, count: Callable[[str], int]) -> list:
+    """순서를 유지하며 budget 이하가 되도록 묶음 생성"""
+    groups, current, used = [], [], 0
+    for text in texts:
+        for piece in (_split_text(text, budget, count) if count(text) > budget else [text]):
+            size = count(piece)
+            if current and used + size > budget:
+                groups.append(current)
+                current, used = [], 0
+            current.append(piece)
+            used += size
+    if current:
+        groups.append(current)
+    return groups
+
+
+def fit_to_context(
+    texts: list,
+    llm,
+    context_window: int = CONTEXT_WINDOW,
+    output_reserve: int = OUTPUT_RESERVE,
+    prompt_overhead: int = PROMPT_OVERHEAD,
+    count: Callable[[str], int] = estimate_tokens,
+    max_concurrency: int = 4,
+    max_rounds: int = 5,
+) -> list:
+    """texts 전체가 한 프롬프트에 들어가도록 필요한 만큼만 계층적으로 요약해서 반환"""
+    budget = context_window - output_reserve - prompt_overhead
+    texts = [text for text in texts if text]
+
+    for round_no in range(1, max_rounds + 1):
+        total = sum(count(text) for text in texts)
+        if total <= budget:
+            return texts
+
+        groups = _pack(texts, budget, count)
+        print(f"[Reduce] {round_no}단계: {total} 토큰 → {len(groups)}개 묶음 병렬 요약")
+        responses = llm.batch(
+            [SUMMARY_PROMPT.format(content="\n\n".join(group)) for group in groups],
+            config={"max_concurrency": max_concurrency},
+        )
+        texts = [response.content for response in responses]
+
+    # 요약해도 줄지 않는 경우 : 모든 결과가 일부라도 남도록 길이에 비례해 앞부분만 남김
+    total = sum(count(text) for text in texts)
+    if total <= budget:
+        return texts
+    print(f"[Reduce] {max_rounds}단계 요약 후에도 {total} 토큰 > 예산 {budget} => 결과별로 비례해 잘라냄 (뒷부분 손실)")
+    return _truncate_proportionally(texts, budget, count)
+
+
+def _truncate_proportionally(texts: list, budget: int, count: Callable[[str], int]) -> list:
+    """각 텍스트를 토큰 수에 비례한 몫(최소 1토큰) 이하로 앞부분만 남김"""
+    total = sum(count(text) for text in texts)
+    result = []
+    for text in texts:
+        share = max(1, budget * count(text) // total)
+        if count(text) > share:
+            # share 토큰 이하인 가장 긴 앞부분 (이진 탐색)
+            low, high = 0, len(text)
+            while low < high:
+                middle = (low + high + 1) // 2
+                if count(text[:middle]) <= share:
+                    low = middle
+                else:
+                    high = middle - 1
+            text = text[:low]
+        result.append(text)
+    return result
@@ -0,0 +1,119 @@
+'''
+단계별 워커 풀 파이프라인 (여러 주제 동시 처리)
+ - 주제 목록을 researcher → analyzer → writer 순서로 하나씩 처리하면
+   전체 시간 = 주제 수 x 3번의 직렬 호출
+ - 단계마다 큐와 워커 풀을 두면 주제 A를 분석하는 동안 주제 B를 조사하는 식으로 겹쳐 실행
+ - 단계별 큐 길이(최대/평균), 처리 건수, 작업 시간을 metrics()로 확인 => 병목 단계 파악
+
+ # 사용
+    pipeline = StagePipeline([("researcher", researcher_node, 2), ("analyzer", analyzer_node, 2)])
+    results = pipeline.run([{"topic": "AI"}, {"topic": "반도체"}])
+    print(pipeline.metrics())
+'''
+import queue
+import threading
+import time
+from typing import Callable
+
+_STOP = object()
+
+
+class _Stage:
+    def __init__(self, name: str, fn: Callable[[dict], dict], workers: int):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self.depth_sum = 0
+        self.depth_samples = 0
+
+    def put(self, item) -> None:
+        self.queue.put(item)
+        depth = self.queue.qsize()
+        with self.lock:
+            self.max_depth = max(self.max_depth, depth)
+            self.depth_sum += depth
+            self.depth_samples += 1
+
+
+class StagePipeline:
+    """(이름, 노드 함수, 워커 수) 목록으로 단계별 워커 풀 구성"""
+
+    def __init__(self, stages: list):
+        self.stages = [_Stage(name, fn, workers) for name, fn, workers in stages]
+        self.elapsed = 0.0
+
+    def _worker(self, index: int, results: dict, done: threading.Semaphore) -> None:
+        stage = self.stages[index]
+        while True:
+            item = stage.queue.get()
+            if item is _STOP:
+                return
+            key, state = item
+
+            start = time.perf_counter()
+            try:
+                # 노드 함수는 상태 업데이트만 반환하므로 기존 상태에 병합
+                state = {**state, **stage.fn(state)}
+                ok = True
+            except Exception as e:
+                print(f"[{stage.name}] 실패: {e}")
+                state = {**state, "error": f"{stage.name}: {e}"}
+                ok = False
+            with stage.lock:
+                stage.busy_seconds += time.perf_counter() - start
+                stage.processed += 1
+                stage.failed += 0 if ok else 1
+
+            if ok and index + 1 < len(self.stages):
+                self.stages[index + 1].put((key, state))
+            else:
+                results[key] = state
+                done.release()
+
+    def run(self, states: list) -> list:
+        """모든 상태를 파이프라인에 넣고 입력 순서대로 최종 상태 반환"""
+        results, done = {}, threading.Semaphore(0)
+        threads = [
+            threading.Thread(target=self._worker, args=(index, results, done), daemon=True, name=f"{stage.name}-{n}")
+            for index, stage in enumerate(self.stages)
+            for n in range(stage.workers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for key, state in enumerate(states):
+            self.stages[0].put((key, state))
+
+        for _ in states:
+            done.acquire()
+        self.elapsed = time.perf_counter() - start
+
+        for stage in self.stages:
+            for _ in range(stage.workers):
+                stage.queue.put(_STOP)
+        for thread in threads:
+            thread.join()
+        return [results[key] for key in range(len(states))]
+
+    def metrics(self) -> dict:
+        """단계별 큐 길이/처리량/가동률"""
+        report = {"elapsed": self.elapsed}
+        for stage in self.stages:
+            capacity = stage.workers * self.elapsed
+            report[stage.name] = {
+                "workers": stage.workers,
+                "processed": stage.processed,
+                "failed": stage.failed,
+                "queue_depth_now": stage.queue.qsize(),
+                "queue_depth_max": stage.max_depth,
+                "queue_depth_avg": stage.depth_sum / stage.depth_samples if stage.depth_samples else 0.0,
+                "busy_seconds": stage.busy_seconds,
+                "utilization": stage.busy_seconds / capacity if capacity else 0.0,
+            }
+        return report